@@ -7,9 +7,15 @@ from flask_sqlalchemy import SQLAlchemy
 from celery import Celery
 
 from config import config
+from app.cache import MetadataCache
+from app.engines import EngineRegistry
+from app.validation import ConnectionValidator
 
 celery = Celery()
 db = SQLAlchemy()
+metadata_cache = MetadataCache()
+engine_registry = EngineRegistry()
+connection_validator = ConnectionValidator()
 
 
 def create_app(config_name=None):
@@ -61,6 +67,9 @@ def register_endpoints(app):
 
 def setup_extensions(app):
     db.init_app(app)
+    metadata_cache.init_app(app)
+    engine_registry.init_app(app)
+    connection_validator.init_app(app)
 
 
 def configure_app(app):
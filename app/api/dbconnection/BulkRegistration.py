@@ -0,0 +1,73 @@
+from flask import request, make_response, jsonify, current_app, url_for
+from flask.views import MethodView
+
+from app import db, connection_validator
+from app.models.database import Database
+from app.schemas.batch_db_conn_schema import bulk_db_conn_schema
+from app.schemas import validate_schema
+from app.tasks.task import enqueue_crawls
+
+
+class BulkRegistrationAPI(MethodView):
+    """
+    Bulk DBConnection Registration Resource: validates every connection concurrently, registers the
+    reachable ones in one transaction and crawls them as one rate limited batch
+    """
+
+    @validate_schema(bulk_db_conn_schema)
+    def post(self):
+        try:
+            candidates = request.get_json()['connections']
+            databases = []
+            errors = {}
+            for index, candidate in enumerate(candidates):
+                try:
+                    databases.append(Database(dbtype=candidate['dbtype'], username=candidate['username'],
+                                              password=candidate['password'], hostname=candidate['hostname'],
+                                              dbname=candidate['dbname'],
+                                              crawl_concurrency=candidate.get('crawl_concurrency'),
+                                              crawl_schemas=candidate.get('crawl_schemas'),
+                                              crawl_include=candidate.get('crawl_include'),
+                                              crawl_exclude=candidate.get('crawl_exclude'),
+                                              crawl_max_tables=candidate.get('crawl_max_tables'),
+                                              collapse_partitions=candidate.get('collapse_partitions', True)))
+                except AssertionError as err:
+                    errors[index] = str(err)
+            if errors:
+                response = jsonify(dict(success=False, message="invalid input", errors=errors))
+                response.status_code = 406
+                return response
+
+            pings = connection_validator.validate(databases, batch=True)
+            registered = [database for database, ping in zip(databases, pings) if ping['valid']]
+            db.session.add_all(registered)
+            db.session.commit()
+            batch = enqueue_crawls([database.id for database in registered],
+                                   current_app.config['BULK_CRAWLS_PER_MINUTE']) if registered else None
+
+            task_ids = iter(task.id for task in batch.results) if batch is not None else iter(())
+            data = []
+            for index, (database, ping) in enumerate(zip(databases, pings)):
+                entry = dict(ping, index=index, dbtype=database.dbtype, hostname=database.hostname,
+                             dbname=database.dbname)
+                if ping['valid']:
+                    entry.update(id=database.id, task_id=next(task_ids))
+                data.append(entry)
+            response = {'data': data, 'count': len(data), 'registered': len(registered), '_links': {}}
+            if batch is not None:
+                response['batch'] = {'batch_id': batch.id}
+                response['_links']['batch'] = url_for('api.batch_progress_api', group_id=batch.id, _external=True)
+            return make_response(jsonify(response)), 201 if registered else 200
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+bulk_registration_view = BulkRegistrationAPI.as_view('bulk_registration_api')
@@ -0,0 +1,50 @@
+import time
+
+from flask import request, make_response, jsonify, current_app
+from flask.views import MethodView
+
+from app import connection_validator
+from app.models.database import Database
+from app.schemas.batch_db_conn_schema import batch_db_conn_schema
+from app.schemas import validate_schema
+
+
+class ConnectionValidationAPI(MethodView):
+    """
+    Batch Connection Validation Resource: pings candidate connections concurrently without registering them
+    """
+
+    @validate_schema(batch_db_conn_schema)
+    def post(self):
+        try:
+            candidates = request.get_json()['connections']
+            databases = [Database(dbtype=candidate['dbtype'], username=candidate['username'],
+                                  password=candidate['password'], hostname=candidate['hostname'],
+                                  dbname=candidate['dbname']) for candidate in candidates]
+            started = time.time()
+            results = connection_validator.validate(databases, batch=True)
+            data = [dict(result, index=index, dbtype=database.dbtype, hostname=database.hostname,
+                         dbname=database.dbname)
+                    for index, (database, result) in enumerate(zip(databases, results))]
+            return make_response(jsonify({'data': data, 'count': len(data),
+                                          'valid': sum(1 for result in results if result['valid']),
+                                          'took_ms': round((time.time() - started) * 1000, 1)})), 200
+        except AssertionError as err:
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{str(err)}'
+            }
+            return make_response(jsonify(response_object)), 401
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+connection_validation_view = ConnectionValidationAPI.as_view('connection_validation_api')
@@ -0,0 +1,67 @@
+from flask import request, make_response, jsonify, current_app
+from flask.views import MethodView
+
+from app import db
+from app.api.dbconnection.MetadataAPI import next_page_url
+from app.models.crawl_run import CrawlRun
+from app.models.database import Database
+
+
+class CrawlHistoryAPI(MethodView):
+    """
+    Crawl History Resource: the instrumented runs of a database, newest first
+    Query arguments: before (id of the last run of the previous page), limit, kind and status.
+    """
+
+    def get(self, db_id):
+        try:
+            config = current_app.config
+            errors = {}
+            arguments = {}
+            for name, default in (('limit', config['CRAWL_HISTORY_PAGE_SIZE']), ('before', None)):
+                value = request.args.get(name)
+                try:
+                    arguments[name] = int(value) if value not in (None, '') else default
+                except ValueError:
+                    errors[name] = '%r is not an integer' % value
+            if 'limit' in arguments and not 1 <= arguments['limit'] <= config['CRAWL_HISTORY_MAX_PAGE_SIZE']:
+                errors['limit'] = 'must be between 1 and %d' % config['CRAWL_HISTORY_MAX_PAGE_SIZE']
+            if errors:
+                response = jsonify(dict(success=False, message="invalid input", errors=errors))
+                response.status_code = 406
+                return response
+            if db.session.query(Database.id).filter(Database.id == db_id).scalar() is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Database not found.'
+                }
+                return make_response(jsonify(response_object)), 404
+
+            query = CrawlRun.query.filter(CrawlRun.database_id == db_id)
+            for name in ('kind', 'status'):
+                if request.args.get(name):
+                    query = query.filter(getattr(CrawlRun, name) == request.args[name])
+            if arguments['before'] is not None:
+                query = query.filter(CrawlRun.id < arguments['before'])
+            # one run more than the page tells whether there is a next page without counting
+            runs = query.order_by(CrawlRun.id.desc()).limit(arguments['limit'] + 1).all()
+            data = [run.to_json() for run in runs[:arguments['limit']]]
+
+            before = data[-1]['id'] if len(runs) > arguments['limit'] else None
+            next_link = None
+            if before is not None:
+                next_link = next_page_url('api.crawl_history_api', db_id, before=before)
+            return make_response(jsonify({'data': data, 'count': len(data), 'before': before,
+                                          '_links': {'next': next_link}})), 200
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+crawl_history_view = CrawlHistoryAPI.as_view('crawl_history_api')
@@ -1,9 +1,11 @@
+import json
+
 from flask import request, make_response, jsonify, current_app, url_for
 from flask.views import MethodView
 from sqlalchemy import exc
 from app.models.database import Database
-from app import db
-from app.tasks.task import save_metadata
+from app import db, metadata_cache, connection_validator
+from app.tasks.task import save_metadata, recrawl_metadata
 from app.schemas.input_db_conn_schema import input_db_conn_schema
 from app.schemas import validate_schema
 
@@ -19,15 +21,26 @@ class DBConnectionAPI(MethodView):
             post_data = request.get_json()
             database = Database(dbtype=post_data['dbtype'], username=post_data['username'],
                                 password=post_data['password'], hostname=post_data['hostname'],
-                                dbname=post_data['dbname'])
-            ping = database.ping_connection()
-            if ping is 1:
-                db.session.add(database)
-                db.session.commit()
-                task = save_metadata.delay(database.id)
-                return make_response(jsonify({'data': database.to_json, 'task': {'task_id': task.task_id}, '_links': {
-                    'task': url_for('api.task_progress_api', task_id=task.id, _external=True)
-                }})), 201
+                                dbname=post_data['dbname'], crawl_concurrency=post_data.get('crawl_concurrency'),
+                                crawl_schemas=post_data.get('crawl_schemas'),
+                                crawl_include=post_data.get('crawl_include'),
+                                crawl_exclude=post_data.get('crawl_exclude'),
+                                crawl_max_tables=post_data.get('crawl_max_tables'),
+                                collapse_partitions=post_data.get('collapse_partitions', True))
+            ping = connection_validator.validate([database])[0]
+            if not ping['valid']:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Some error occurred. Please try again.',
+                    'reason': ping['reason']
+                }
+                return make_response(jsonify(response_object)), 401
+            db.session.add(database)
+            db.session.commit()
+            task = save_metadata.delay(database.id)
+            return make_response(jsonify({'data': database.to_json, 'task': {'task_id': task.task_id}, '_links': {
+                'task': url_for('api.task_progress_api', task_id=task.id, _external=True)
+            }})), 201
         except exc.DBAPIError as e:
             current_app.logger.error(str(e))
             msg = str(e.orig.args[1]).split('(')[0].rstrip(' ')
@@ -65,7 +78,42 @@ class DBConnectionAPI(MethodView):
     def get(self, db_id):
         try:
             database = Database.query.get(db_id)
-            return make_response(jsonify(database.to_json)), 200
+            if database.status == 'pending':
+                # a crawl is still storing tables, nothing worth caching yet
+                return make_response(jsonify(database.to_json)), 200
+            etag = metadata_cache.key(database)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+            body = metadata_cache.get_or_create(etag, lambda: jsonify(database.metadata_json).get_data())
+            # credentials never reach the cache, they are added back to the cached metadata when serving
+            response = jsonify(dict(json.loads(body), **database.credentials_json))
+            response.set_etag(etag)
+            return response
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+    def put(self, db_id):
+        try:
+            database = Database.query.get(db_id)
+            if database is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Database not found.'
+                }
+                return make_response(jsonify(response_object)), 404
+            force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+            task = recrawl_metadata.delay(database.id, force=force)
+            return make_response(jsonify({'task': {'task_id': task.task_id}, '_links': {
+                'task': url_for('api.task_progress_api', task_id=task.id, _external=True)
+            }})), 202
         except Exception as e:
             current_app.logger.error(str(e))
             response_object = {
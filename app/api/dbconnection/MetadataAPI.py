@@ -0,0 +1,183 @@
+from collections import OrderedDict
+
+from flask import request, make_response, jsonify, current_app, url_for
+from flask.views import MethodView
+from sqlalchemy import select
+
+from app import db
+from app.models.column import Column
+from app.models.database import Database
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+tables = Table.__table__
+columns = Column.__table__
+foreign_keys = ForeignKey.__table__
+referred_tables = tables.alias('referred_tables')
+referred_columns = columns.alias('referred_columns')
+
+
+def like_prefix(prefix):
+    """LIKE pattern matching names that start with prefix, wildcards in the prefix are taken literally"""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def next_page_url(endpoint, db_id, **page):
+    """
+    link to the next page carrying over the query arguments of this one, those url_for or the route
+    itself take as keywords (endpoint, db_id, _external and friends) are dropped instead of clashing
+    """
+    args = dict((name, value) for name, value in request.args.items()
+                if name not in ('endpoint', 'db_id') and not name.startswith('_'))
+    args.update(page)
+    return url_for(endpoint, db_id=db_id, _external=True, **args)
+
+
+class MetadataPageAPI(MethodView):
+    """
+    Keyset paginated listing of crawled metadata.
+    Query arguments: after (id of the last row of the previous page), limit, prefix (table name prefix),
+    table_id and fields (comma separated projection, the id is always included).
+    """
+    endpoint = None
+    fields = OrderedDict()
+    # the listed rows joined to the tables table, which scopes them to one database
+    source = None
+    key = None
+    table_name = None
+    table_id = None
+
+    def parse_args(self):
+        errors = {}
+        args = {}
+        for name in ('after', 'limit', 'table_id'):
+            value = request.args.get(name)
+            try:
+                args[name] = int(value) if value not in (None, '') else None
+            except ValueError:
+                errors[name] = '%r is not an integer' % value
+        max_page_size = current_app.config['METADATA_MAX_PAGE_SIZE']
+        if args.get('limit') is None:
+            args['limit'] = current_app.config['METADATA_PAGE_SIZE']
+        elif not 1 <= args['limit'] <= max_page_size:
+            errors['limit'] = 'must be between 1 and %d' % max_page_size
+        args['prefix'] = request.args.get('prefix') or None
+        requested = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.fields]
+        if unknown:
+            errors['fields'] = 'unknown fields %s, expected some of %s' % (', '.join(unknown), ', '.join(self.fields))
+        args['fields'] = ['id'] + [name for name in requested if name != 'id'] if requested else list(self.fields)
+        return args, errors
+
+    def get(self, db_id):
+        try:
+            args, errors = self.parse_args()
+            if errors:
+                response = jsonify(dict(success=False, message="invalid input", errors=errors))
+                response.status_code = 406
+                return response
+            if db.session.query(Database.id).filter(Database.id == db_id).scalar() is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Database not found.'
+                }
+                return make_response(jsonify(response_object)), 404
+
+            query = select([self.fields[name].label(name) for name in args['fields']]).select_from(self.source)
+            query = query.where(tables.c.database_id == db_id)
+            if args['prefix'] is not None:
+                query = query.where(self.table_name.like(like_prefix(args['prefix']), escape='\\'))
+            if args['table_id'] is not None:
+                query = query.where(self.table_id == args['table_id'])
+            if args['after'] is not None:
+                query = query.where(self.key > args['after'])
+            # one row more than the page tells whether there is a next page without counting
+            rows = db.session.execute(query.order_by(self.key).limit(args['limit'] + 1)).fetchall()
+            data = [dict(zip(args['fields'], row)) for row in rows[:args['limit']]]
+
+            after = data[-1]['id'] if len(rows) > args['limit'] else None
+            next_link = None
+            if after is not None:
+                next_link = next_page_url(self.endpoint, db_id, after=after)
+            return make_response(jsonify({'data': data, 'count': len(data), 'after': after,
+                                          '_links': {'next': next_link}})), 200
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+class TablesAPI(MetadataPageAPI):
+    """
+    Crawled Tables Resource
+    """
+    endpoint = 'api.tables_api'
+    fields = OrderedDict([
+        ('id', tables.c.id),
+        ('table_name', tables.c.table_name),
+        ('schema_name', tables.c.schema_name),
+        ('database_id', tables.c.database_id),
+        ('fingerprint', tables.c.fingerprint)
+    ])
+    source = tables
+    key = tables.c.id
+    table_name = tables.c.table_name
+    table_id = tables.c.id
+
+
+class ColumnsAPI(MetadataPageAPI):
+    """
+    Crawled Columns Resource
+    """
+    endpoint = 'api.columns_api'
+    fields = OrderedDict([
+        ('id', columns.c.id),
+        ('column_name', columns.c.column_name),
+        ('column_type', columns.c.column_type),
+        ('column_default', columns.c.column_default),
+        ('is_nullable', columns.c.is_nullable),
+        ('is_autoincrement', columns.c.is_autoincrement),
+        ('is_pk', columns.c.is_pk),
+        ('is_fk', columns.c.is_fk),
+        ('table_id', columns.c.table_id),
+        ('table_name', tables.c.table_name)
+    ])
+    source = columns.join(tables, columns.c.table_id == tables.c.id)
+    key = columns.c.id
+    table_name = tables.c.table_name
+    table_id = columns.c.table_id
+
+
+class RelationsAPI(MetadataPageAPI):
+    """
+    Crawled Foreign Keys Resource, the prefix and table_id arguments filter on the constrained table
+    """
+    endpoint = 'api.relations_api'
+    fields = OrderedDict([
+        ('id', foreign_keys.c.id),
+        ('table_id', foreign_keys.c.table_id),
+        ('table_name', tables.c.table_name),
+        ('column_id', foreign_keys.c.column_id),
+        ('column_name', columns.c.column_name),
+        ('referred_table_id', foreign_keys.c.referred_table_id),
+        ('referred_table', referred_tables.c.table_name),
+        ('referred_column_id', foreign_keys.c.referred_column_id),
+        ('referred_column', referred_columns.c.column_name)
+    ])
+    source = foreign_keys.join(tables, foreign_keys.c.table_id == tables.c.id) \
+        .join(columns, foreign_keys.c.column_id == columns.c.id) \
+        .join(referred_tables, foreign_keys.c.referred_table_id == referred_tables.c.id) \
+        .join(referred_columns, foreign_keys.c.referred_column_id == referred_columns.c.id)
+    key = foreign_keys.c.id
+    table_name = tables.c.table_name
+    table_id = foreign_keys.c.table_id
+
+
+# define the API resources
+tables_view = TablesAPI.as_view('tables_api')
+columns_view = ColumnsAPI.as_view('columns_api')
+relations_view = RelationsAPI.as_view('relations_api')
@@ -0,0 +1,83 @@
+from collections import Counter
+from datetime import datetime
+
+from flask import make_response, jsonify, current_app
+from flask.views import MethodView
+
+from app import celery
+from app.crawler.scheduler import is_backing_off, is_in_flight, staleness
+from app.models.database import Database
+
+
+def queue_depth(queue='celery'):
+    """messages waiting in the broker queue, None when the broker cannot be asked"""
+    try:
+        with celery.connection_for_read() as connection:
+            # a missing broker must not hang the status page, give up after the first failed connect
+            connection.ensure_connection(max_retries=1)
+            channel = connection.channel()
+            try:
+                return channel.queue_declare(queue=queue, passive=True).message_count
+            finally:
+                channel.close()
+    except Exception as e:
+        current_app.logger.error(str(e))
+        return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class SchedulerStatus(MethodView):
+    """
+    Refresh Scheduler Resource
+    """
+
+    def get(self):
+        try:
+            config = current_app.config
+            now = datetime.utcnow()
+            databases = Database.query.all()
+            in_flight = Counter(database.hostname for database in databases
+                                if is_in_flight(database, now, config['CRAWL_REFRESH_TIMEOUT']))
+            ages = [staleness(database, now) for database in databases]
+            backing_off = [is_backing_off(database, now, config['CRAWL_RETRY_BACKOFF'],
+                                          config['CRAWL_RETRY_BACKOFF_MAX']) for database in databases]
+            due = sum(1 for database, age, waits in zip(databases, ages, backing_off)
+                      if database.status != 'pending' and not waits
+                      and (age is None or age >= config['CRAWL_REFRESH_INTERVAL']))
+            costs = sorted(database.last_crawl_seconds for database in databases
+                           if database.last_crawl_seconds is not None)
+            response = {
+                'queue_depth': queue_depth(),
+                'databases': len(databases),
+                'due': due,
+                'in_flight': sum(in_flight.values()),
+                'in_flight_by_host': dict(in_flight),
+                'crawls_skipped': sum(database.crawls_skipped or 0 for database in databases),
+                'backing_off': sum(backing_off),
+                'failing': sum(1 for database in databases if database.crawl_failures),
+                'max_staleness_seconds': max([age for age in ages if age is not None], default=None),
+                'crawl_seconds': {
+                    'avg': sum(costs) / len(costs) if costs else None,
+                    'p50': percentile(costs, 0.5),
+                    'p95': percentile(costs, 0.95),
+                    'max': costs[-1] if costs else None
+                }
+            }
+            return make_response(jsonify(response)), 200
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+scheduler_status_view = SchedulerStatus.as_view('scheduler_status_api')
@@ -0,0 +1,45 @@
+from flask import request, make_response, jsonify, current_app, Response, stream_with_context
+from flask.views import MethodView
+
+from app import db
+from app.models.database import Database
+from app.models.serializer import EXPORT_FORMATS
+
+
+class SchemaExport(MethodView):
+    """
+    Crawled Schema Export Resource, streamed as NDJSON (default) or as one JSON document
+    """
+
+    def get(self, db_id):
+        try:
+            export_format = request.args.get('format', 'ndjson')
+            if export_format not in EXPORT_FORMATS:
+                response = jsonify(dict(success=False, message="invalid input",
+                                        errors={'format': 'must be one of %s' % ', '.join(sorted(EXPORT_FORMATS))}))
+                response.status_code = 406
+                return response
+            database = Database.query.get(db_id)
+            if database is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Database not found.'
+                }
+                return make_response(jsonify(response_object)), 404
+            export, mimetype = EXPORT_FORMATS[export_format]
+            body = export(db.session, database, current_app.config['EXPORT_BATCH_TABLES'])
+            return Response(stream_with_context(body), mimetype=mimetype, headers={
+                'Content-Disposition': 'attachment; filename=%s-%d.%s' % (database.dbname, database.id, export_format)
+            })
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+schema_export_view = SchemaExport.as_view('schema_export_api')
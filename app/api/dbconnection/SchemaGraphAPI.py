@@ -0,0 +1,129 @@
+from flask import request, make_response, jsonify, current_app
+from flask.views import MethodView
+from sqlalchemy import and_, or_, select
+
+from app import db
+from app.crawler.graph import load_graph
+from app.models.column import Column
+from app.models.database import Database
+from app.models.foreignkey import ForeignKey
+
+referred_columns = Column.__table__.alias('referred_columns')
+
+
+def invalid(errors):
+    response = jsonify(dict(success=False, message="invalid input", errors=errors))
+    response.status_code = 406
+    return response
+
+
+def table_json(graph, position, **extra):
+    table = {'table_id': graph.table_ids[position], 'table_name': graph.table_names[position]}
+    table.update(extra)
+    return table
+
+
+def joins(table_ids):
+    """the foreign key columns joining each consecutive pair of tables on a path, in either direction"""
+    pairs = list(zip(table_ids, table_ids[1:]))
+    if not pairs:
+        return []
+    query = select([ForeignKey.table_id, Column.column_name, ForeignKey.referred_table_id,
+                    referred_columns.c.column_name.label('referred_column')]) \
+        .select_from(ForeignKey.__table__.join(Column.__table__, ForeignKey.column_id == Column.id)
+                     .join(referred_columns, ForeignKey.referred_column_id == referred_columns.c.id)) \
+        .where(or_(*[or_(and_(ForeignKey.table_id == a, ForeignKey.referred_table_id == b),
+                         and_(ForeignKey.table_id == b, ForeignKey.referred_table_id == a)) for a, b in pairs])) \
+        .order_by(ForeignKey.id)
+    by_pair = {}
+    for row in db.session.execute(query):
+        by_pair.setdefault(frozenset((row.table_id, row.referred_table_id)), []).append({
+            'table_id': row.table_id,
+            'column_name': row.column_name,
+            'referred_table_id': row.referred_table_id,
+            'referred_column': row.referred_column
+        })
+    return [by_pair.get(frozenset(pair), []) for pair in pairs]
+
+
+class SchemaGraphAPI(MethodView):
+    """
+    Foreign Key Graph Resource: join paths, connected components and neighbourhoods of crawled tables
+    """
+
+    def get(self, db_id, query):
+        try:
+            database = Database.query.get(db_id)
+            if database is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Database not found.'
+                }
+                return make_response(jsonify(response_object)), 404
+            graph = load_graph(db.session, database, current_app.config['SCHEMA_GRAPH_CACHE_SIZE'])
+            return getattr(self, query)(graph)
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+    def path(self, graph):
+        errors = {}
+        positions = {}
+        for name in ('from', 'to'):
+            positions[name] = graph.position(request.args.get(name, ''))
+            if positions[name] is None:
+                errors[name] = 'unknown table %r' % request.args.get(name)
+        if errors:
+            return invalid(errors)
+        path = graph.shortest_path(positions['from'], positions['to'])
+        if path is None:
+            return make_response(jsonify({'path': None, 'hops': None, 'joins': []})), 200
+        return make_response(jsonify({
+            'path': [table_json(graph, position) for position in path],
+            'hops': len(path) - 1,
+            'joins': joins([graph.table_ids[position] for position in path])
+        })), 200
+
+    def components(self, graph):
+        try:
+            min_size = int(request.args.get('min_size', 1))
+        except ValueError:
+            return invalid({'min_size': '%r is not an integer' % request.args.get('min_size')})
+        components = graph.components()
+        return make_response(jsonify({
+            'tables': len(graph),
+            'edges': graph.edges,
+            'count': len(components),
+            'components': [[table_json(graph, position) for position in component]
+                           for component in components if len(component) >= min_size]
+        })), 200
+
+    def neighbourhood(self, graph):
+        errors = {}
+        position = graph.position(request.args.get('table', ''))
+        if position is None:
+            errors['table'] = 'unknown table %r' % request.args.get('table')
+        try:
+            hops = int(request.args.get('hops', 1))
+            if not 0 <= hops <= current_app.config['SCHEMA_GRAPH_MAX_HOPS']:
+                errors['hops'] = 'must be between 0 and %d' % current_app.config['SCHEMA_GRAPH_MAX_HOPS']
+        except ValueError:
+            errors['hops'] = '%r is not an integer' % request.args.get('hops')
+        if errors:
+            return invalid(errors)
+        distances = graph.neighbourhood(position, hops)
+        return make_response(jsonify({
+            'table': table_json(graph, position),
+            'hops': hops,
+            'tables': [table_json(graph, neighbour, distance=distance)
+                       for neighbour, distance in sorted(distances.items(), key=lambda item: (item[1], item[0]))]
+        })), 200
+
+
+# define the API resources
+schema_graph_view = SchemaGraphAPI.as_view('schema_graph_api')
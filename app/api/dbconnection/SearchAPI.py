@@ -0,0 +1,57 @@
+import time
+
+from flask import request, make_response, jsonify, current_app
+from flask.views import MethodView
+
+from app import db
+from app.crawler.search import search
+
+
+class SearchAPI(MethodView):
+    """
+    Table And Column Name Search Resource
+    Query arguments: q, kind (table or column), type (column type), database_id and limit.
+    """
+
+    def get(self):
+        try:
+            config = current_app.config
+            errors = {}
+            query = request.args.get('q', '').strip()
+            if not query:
+                errors['q'] = 'a search term is required'
+            kind = request.args.get('kind') or None
+            if kind not in (None, 'table', 'column'):
+                errors['kind'] = 'must be table or column'
+            arguments = {}
+            for name, default in (('limit', config['SEARCH_PAGE_SIZE']), ('database_id', None)):
+                value = request.args.get(name)
+                try:
+                    arguments[name] = int(value) if value not in (None, '') else default
+                except ValueError:
+                    errors[name] = '%r is not an integer' % value
+            if 'limit' in arguments and not 1 <= arguments['limit'] <= config['SEARCH_MAX_PAGE_SIZE']:
+                errors['limit'] = 'must be between 1 and %d' % config['SEARCH_MAX_PAGE_SIZE']
+            if errors:
+                response = jsonify(dict(success=False, message="invalid input", errors=errors))
+                response.status_code = 406
+                return response
+
+            started = time.time()
+            results = search(db.session, query, kind=kind, column_type=request.args.get('type') or None,
+                             database_id=arguments['database_id'], limit=arguments['limit'],
+                             max_terms=config['SEARCH_MAX_TERMS'], min_similarity=config['SEARCH_MIN_SIMILARITY'])
+            return make_response(jsonify({'query': query, 'count': len(results), 'results': results,
+                                          'took_ms': round((time.time() - started) * 1000, 1)})), 200
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+# define the API resources
+search_view = SearchAPI.as_view('search_api')
@@ -1,6 +1,76 @@
-from flask import make_response, jsonify, current_app
+import json
+import time
+from collections import Counter
+
+from flask import make_response, jsonify, current_app, Response, stream_with_context
 from flask.views import MethodView
-from app.tasks.task import save_metadata
+from celery.result import GroupResult
+
+from app import celery
+from app.crawler.progress import progress_channel, redis_client
+from app.tasks.task import save_metadata, save_metadata_chunk, link_metadata_chunks
+
+# states a task never leaves, a stream following it ends there
+FINISHED_STATES = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+
+def task_progress(task_id):
+    """progress of a crawl task as reported by the result backend, with the task's own info"""
+    task = save_metadata.AsyncResult(task_id)
+    if task.state == 'PENDING':
+        # job did not start yet
+        response = {
+            'state': task.state,
+            'status': 'Pending...'
+        }
+    elif isinstance(task.info, dict):
+        response = {
+            'state': task.state,
+            'current': task.info.get('current', 0),
+            'total': task.info.get('total', 1),
+            'status': task.info.get('status', '')
+        }
+        if 'result' in task.info:
+            response['result'] = task.info['result']
+        for key in ('stage', 'rows_per_second', 'eta_seconds', 'parts'):
+            if key in task.info:
+                response[key] = task.info[key]
+        if 'subtasks' in task.info:
+            response.update(fan_out_progress(task.info))
+    else:
+        # something went wrong in the background job, it failed, waits for a retry or was revoked
+        response = {
+            'state': task.state,
+            'current': 1 if task.state in FINISHED_STATES else 0,
+            'total': 1,
+            'status': str(task.info),  # this is the exception raised
+        }
+    return response, task.info if isinstance(task.info, dict) else {}
+
+
+def batch_progress(group_id):
+    """
+    Progress of a batch of crawls enqueued as one group, None when the group is unknown. Each crawl
+    weighs one unit whatever its size, a finished, failed or revoked crawl counts as done.
+    """
+    result = GroupResult.restore(group_id, app=celery)
+    if result is None:
+        return None
+    crawls = []
+    states = Counter()
+    current = 0.0
+    for task in result.results:
+        response, info = task_progress(task.id)
+        states[response['state']] += 1
+        if response['state'] in FINISHED_STATES:
+            current += 1
+        elif response.get('total'):
+            current += float(response.get('current', 0)) / response['total']
+        crawls.append({'task_id': task.id, 'state': response['state'], 'result': response.get('result'),
+                       'current': response.get('current', 0), 'total': response.get('total', 1)})
+    done = sum(states[state] for state in FINISHED_STATES) == len(crawls)
+    return {'state': 'SUCCESS' if done else 'PROGRESS', 'current': round(current, 2), 'total': len(crawls),
+            'status': 'completed' if done else 'pending', 'states': dict(states), 'crawls': crawls}
 
 
 class TaskProgress(MethodView):
@@ -10,30 +80,32 @@ class TaskProgress(MethodView):
 
     def get(self, task_id):
         try:
-            task = save_metadata.AsyncResult(task_id)
-            if task.state == 'PENDING':
-                # job did not start yet
-                response = {
-                    'state': task.state,
-                    'status': 'Pending...'
-                }
-            elif task.state != 'FAILURE':
-                response = {
-                    'state': task.state,
-                    'current': task.info.get('current', 0),
-                    'total': task.info.get('total', 1),
-                    'status': task.info.get('status', '')
-                }
-                if 'result' in task.info:
-                    response['result'] = task.info['result']
-            else:
-                # something went wrong in the background job
-                response = {
-                    'state': task.state,
-                    'current': 1,
-                    'total': 1,
-                    'status': str(task.info),  # this is the exception raised
+            response, info = task_progress(task_id)
+            return make_response(jsonify(response)), 200
+        except Exception as e:
+            current_app.logger.error(str(e))
+            response_object = {
+                'status': 'fail',
+                'message': 'Some error occurred. Please try again.',
+                'reason': f'{e}'
+            }
+            return make_response(jsonify(response_object)), 401
+
+
+class BatchProgress(MethodView):
+    """
+    Batch Progress Resource, the aggregated progress of the crawls of a bulk registration
+    """
+
+    def get(self, group_id):
+        try:
+            response = batch_progress(group_id)
+            if response is None:
+                response_object = {
+                    'status': 'fail',
+                    'message': 'Batch not found.'
                 }
+                return make_response(jsonify(response_object)), 404
             return make_response(jsonify(response)), 200
         except Exception as e:
             current_app.logger.error(str(e))
@@ -45,5 +117,143 @@ class TaskProgress(MethodView):
             return make_response(jsonify(response_object)), 401
 
 
+class TaskProgressStream(MethodView):
+    """
+    Task Progress Stream Resource, Server-Sent Events fed by the progress events the tasks publish
+    """
+
+    def get(self, task_id):
+        config = current_app.config
+        events = progress_events(task_id, redis_client(config['PROGRESS_REDIS_URL']),
+                                 heartbeat=config['PROGRESS_STREAM_HEARTBEAT'],
+                                 timeout=config['PROGRESS_STREAM_TIMEOUT'])
+        return Response(stream_with_context(events), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+STREAMED = ('state', 'current', 'total', 'status', 'result', 'stage', 'rows_per_second', 'eta_seconds', 'parts')
+
+
+def sse(data):
+    return 'data: %s\n\n' % json.dumps(data, sort_keys=True, default=str)
+
+
+def progress_events(task_id, client, heartbeat=15, timeout=3600):
+    """
+    Stream the progress of a task: the current state first, then every published event until the crawl
+    finishes. A crawl split into chunks is followed through its subtasks and chord callback. Whenever the
+    stream is quiet for a heartbeat the backend is read once more, so a missed event cannot stall it, and
+    without a Redis client that reading is all the stream does.
+    """
+    pubsub = None
+    if client is not None:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(progress_channel(task_id))
+    try:
+        response, info = task_progress(task_id)
+        yield sse(response)
+        if response['state'] in FINISHED_STATES:
+            return
+        fan_out = None
+        if 'subtasks' in info:
+            fan_out = FanOutProgress(info, pubsub)
+        deadline = time.time() + timeout
+        quiet_since = time.time()
+        last = response
+        while time.time() < deadline:
+            message = pubsub.get_message(timeout=1.0) if pubsub is not None else time.sleep(1.0)
+            if message is None or message['type'] != 'message':
+                if time.time() - quiet_since < (heartbeat if pubsub is not None else 1.0):
+                    continue
+                quiet_since = time.time()
+                response, info = task_progress(task_id)
+                if fan_out is None and 'subtasks' in info:
+                    fan_out = FanOutProgress(info, pubsub)
+                if response != last:
+                    last = response
+                    yield sse(response)
+                else:
+                    yield ': keepalive\n\n'
+                if response['state'] in FINISHED_STATES:
+                    return
+                continue
+            quiet_since = time.time()
+            channel = message['channel'].decode('utf-8') if isinstance(message['channel'], bytes) \
+                else message['channel']
+            event = json.loads(message['data'])
+            if fan_out is None and 'subtasks' in event:
+                fan_out = FanOutProgress(event, pubsub)
+                continue
+            response = fan_out.update(channel, event) if fan_out is not None else \
+                dict((key, event[key]) for key in STREAMED if key in event)
+            if response is None or response == last:
+                continue
+            last = response
+            yield sse(response)
+            if response['state'] in FINISHED_STATES:
+                return
+    finally:
+        if pubsub is not None:
+            pubsub.close()
+
+
+class FanOutProgress(object):
+    """progress of a crawl split into chunk subtasks, aggregated from their events in table units"""
+
+    def __init__(self, info, pubsub):
+        self.tables = dict(info['subtasks'])
+        self.fractions = dict((task_id, 0.0) for task_id in self.tables)
+        self.callback = progress_channel(info['callback'])
+        self.channels = dict((progress_channel(task_id), task_id) for task_id in self.tables)
+        if pubsub is not None:
+            pubsub.subscribe(self.callback, *self.channels)
+
+    def update(self, channel, event):
+        total = sum(self.tables.values())
+        if channel == self.callback:
+            if event['state'] == 'SUCCESS':
+                return {'state': 'SUCCESS', 'current': total, 'total': total, 'status': 'completed',
+                        'result': event.get('result')}
+            if event['state'] in ('FAILURE', 'REVOKED'):
+                return {'state': event['state'], 'current': int(self.current), 'total': total,
+                        'status': event.get('status')}
+            return None
+        task_id = self.channels.get(channel)
+        if task_id is None:
+            return None
+        if event['state'] == 'SUCCESS':
+            self.fractions[task_id] = 1.0
+        elif event['state'] == 'PROGRESS' and event.get('total'):
+            self.fractions[task_id] = float(event.get('current', 0)) / event['total']
+        return {'state': 'PROGRESS', 'current': int(self.current), 'total': total, 'status': 'pending'}
+
+    @property
+    def current(self):
+        return sum(self.tables[task_id] * fraction for task_id, fraction in self.fractions.items())
+
+
+def fan_out_progress(info):
+    """
+    Progress of a crawl split into chunk subtasks, counted in tables so chunks that have not
+    started yet still weigh in. The state follows the chord callback that finishes the crawl.
+    """
+    current = 0
+    total = 0
+    for task_id, tables in info['subtasks']:
+        subtask = save_metadata_chunk.AsyncResult(task_id)
+        if subtask.state in ('PROGRESS', 'SUCCESS') and isinstance(subtask.info, dict) and subtask.info.get('total'):
+            current += tables * subtask.info.get('current', 0) / subtask.info['total']
+        total += tables
+    callback = link_metadata_chunks.AsyncResult(info['callback'])
+    if callback.state == 'SUCCESS':
+        return {'state': callback.state, 'current': total, 'total': total, 'status': 'completed',
+                'result': callback.info['result']}
+    if callback.state in ('FAILURE', 'REVOKED'):
+        return {'state': callback.state, 'current': int(current), 'total': total, 'status': str(callback.info)}
+    return {'state': 'PROGRESS', 'current': int(current), 'total': total, 'status': 'pending'}
+
+
 # define the API resources
 task_progress_view = TaskProgress.as_view('task_progress_api')
+task_progress_stream_view = TaskProgressStream.as_view('task_progress_stream_api')
+batch_progress_view = BatchProgress.as_view('batch_progress_api')
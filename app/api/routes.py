@@ -3,10 +3,18 @@ from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, request, url_for, current_app, make_response
 
 from app.api.dbconnection.DBConnectionAPI import dbconnection_view
-from app.api.dbconnection.TaskProgress import task_progress_view
+from app.api.dbconnection.ConnectionValidation import connection_validation_view
+from app.api.dbconnection.BulkRegistration import bulk_registration_view
+from app.api.dbconnection.TaskProgress import task_progress_view, task_progress_stream_view, batch_progress_view
+from app.api.dbconnection.SchedulerStatus import scheduler_status_view
+from app.api.dbconnection.MetadataAPI import tables_view, columns_view, relations_view
+from app.api.dbconnection.SchemaExport import schema_export_view
+from app.api.dbconnection.SchemaGraphAPI import schema_graph_view
+from app.api.dbconnection.SearchAPI import search_view
+from app.api.dbconnection.CrawlHistoryAPI import crawl_history_view
 from app.tasks.task import long_task, reverse_messages, save_metadata
 from app.models.message import Message
-from app import db
+from app import db, metadata_cache, engine_registry
 
 api_blueprint = Blueprint('api', __name__)
 
@@ -17,8 +25,21 @@ def init_db():
 
 
 api_blueprint.add_url_rule('/connection', view_func=dbconnection_view, methods=['POST'])
+api_blueprint.add_url_rule('/connection/bulk', view_func=bulk_registration_view, methods=['POST'])
+api_blueprint.add_url_rule('/connection/validate', view_func=connection_validation_view, methods=['POST'])
 api_blueprint.add_url_rule('/connection/<int:db_id>', view_func=dbconnection_view, methods=['GET', 'PUT', 'DELETE'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/tables', view_func=tables_view, methods=['GET'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/columns', view_func=columns_view, methods=['GET'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/relations', view_func=relations_view, methods=['GET'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/export', view_func=schema_export_view, methods=['GET'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/graph/<any(path, components, neighbourhood):query>',
+                           view_func=schema_graph_view, methods=['GET'])
+api_blueprint.add_url_rule('/connection/<int:db_id>/crawls', view_func=crawl_history_view, methods=['GET'])
+api_blueprint.add_url_rule('/search', view_func=search_view, methods=['GET'])
 api_blueprint.add_url_rule('/progress/<task_id>', view_func=task_progress_view, methods=['GET'])
+api_blueprint.add_url_rule('/progress/batch/<group_id>', view_func=batch_progress_view, methods=['GET'])
+api_blueprint.add_url_rule('/progress/<task_id>/stream', view_func=task_progress_stream_view, methods=['GET'])
+api_blueprint.add_url_rule('/scheduler', view_func=scheduler_status_view, methods=['GET'])
 
 
 @api_blueprint.route('/status', methods=['GET'])
@@ -29,6 +50,16 @@ def ping_pong():
     })
 
 
+@api_blueprint.route('/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(metadata_cache.stats)
+
+
+@api_blueprint.route('/engines', methods=['GET'])
+def engine_stats():
+    return jsonify(engine_registry.stats)
+
+
 @api_blueprint.route("/ip", methods=["GET"])
 def get_my_ip():
     return jsonify({'ip': request.environ.get('HTTP_X_REAL_IP', request.remote_addr)}), 200
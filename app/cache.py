@@ -0,0 +1,101 @@
+import logging
+import threading
+from collections import OrderedDict, Counter
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache(object):
+    """
+    Read-through cache of serialized database metadata. Entries live in a per-process LRU and, when
+    METADATA_CACHE_REDIS_URL is set, in Redis shared by every process. Keys carry the crawl generation
+    of the database, a finished or failed crawl bumps it so stale entries are never read again and
+    simply age out, and a random token of the database row so a re-created database reusing an id
+    never reads its predecessor's entries. Redis being unavailable only costs the cache, never the request.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 128
+        self.ttl = 3600
+        self.redis = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config['METADATA_CACHE_SIZE']
+        self.ttl = app.config['METADATA_CACHE_TTL']
+        if app.config.get('METADATA_CACHE_REDIS_URL'):
+            import redis
+            self.redis = redis.StrictRedis.from_url(app.config['METADATA_CACHE_REDIS_URL'],
+                                                    socket_timeout=1, socket_connect_timeout=1)
+
+    @staticmethod
+    def key(database):
+        return 'metadata:%d:%s:%d' % (database.id, database.cache_token, database.crawl_generation or 0)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return self.entries[key]
+        value = None
+        if self.redis is not None:
+            try:
+                value = self.redis.get(key)
+            except Exception as e:
+                self.counters['redis_errors'] += 1
+                logger.warning('metadata cache read failed: %s', e)
+        if value is None:
+            self.counters['misses'] += 1
+            return None
+        self.counters['redis_hits'] += 1
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, value, ex=self.ttl)
+            except Exception as e:
+                self.counters['redis_errors'] += 1
+                logger.warning('metadata cache write failed: %s', e)
+
+    def get_or_create(self, key, create):
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.set(key, value)
+        return value
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def stats(self):
+        """counters of this process since it started"""
+        lookups = self.counters['hits'] + self.counters['redis_hits'] + self.counters['misses']
+        return {
+            'hits': self.counters['hits'],
+            'redis_hits': self.counters['redis_hits'],
+            'misses': self.counters['misses'],
+            'hit_ratio': round(float(lookups - self.counters['misses']) / lookups, 3) if lookups else None,
+            'evictions': self.counters['evictions'],
+            'redis_errors': self.counters['redis_errors'],
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'redis': self.redis is not None
+        }
@@ -0,0 +1,385 @@
+import hashlib
+import re
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, exc, text
+from sqlalchemy.sql import sqltypes
+from sqlalchemy.util import topological
+
+# set-based catalog queries returning every table, column, primary key and foreign key of a schema.
+# every query takes a single :schema bind parameter and orders its rows so they can be grouped per table,
+# {restrict} is where catalog_query narrows it down to some tables, see TABLE_NAME_COLUMNS.
+CATALOG_QUERIES = {
+    'postgresql': {
+        'tables': """
+            SELECT c.relname AS table_name
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') {restrict}
+            ORDER BY c.relname
+        """,
+        'columns': """
+            SELECT c.relname AS table_name, a.attname AS column_name,
+                   pg_catalog.format_type(a.atttypid, a.atttypmod) AS data_type,
+                   pg_catalog.pg_get_expr(d.adbin, d.adrelid) AS column_default,
+                   NOT a.attnotnull AS is_nullable
+            FROM pg_catalog.pg_attribute a
+            JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum AND a.atthasdef
+            WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped {restrict}
+            ORDER BY c.relname, a.attnum
+        """,
+        # pg_constraint rather than information_schema, whose constraint views only show tables the role owns
+        'primary_keys': """
+            SELECT c.relname AS table_name, a.attname AS column_name
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, position)
+            JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            WHERE n.nspname = :schema AND con.contype = 'p' {restrict}
+            ORDER BY c.relname, k.position
+        """,
+        'foreign_keys': """
+            SELECT con.conname AS constraint_name, c.relname AS table_name, a.attname AS column_name,
+                   rn.nspname AS referred_schema, rc.relname AS referred_table, ra.attname AS referred_column
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            JOIN pg_catalog.pg_class rc ON rc.oid = con.confrelid
+            JOIN pg_catalog.pg_namespace rn ON rn.oid = rc.relnamespace
+            CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, referred_attnum, position)
+            JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            JOIN pg_catalog.pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.referred_attnum
+            WHERE n.nspname = :schema AND con.contype = 'f' {restrict}
+            ORDER BY c.relname, con.conname, k.position
+        """,
+    },
+    'mysql': {
+        'tables': """
+            SELECT TABLE_NAME AS table_name
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = :schema AND TABLE_TYPE = 'BASE TABLE' {restrict}
+            ORDER BY TABLE_NAME
+        """,
+        'columns': """
+            SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, DATA_TYPE AS data_type,
+                   COLUMN_DEFAULT AS column_default, IS_NULLABLE = 'YES' AS is_nullable,
+                   EXTRA LIKE '%auto_increment%' AS is_autoincrement
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = :schema {restrict}
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+        """,
+        'primary_keys': """
+            SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = :schema AND CONSTRAINT_NAME = 'PRIMARY' {restrict}
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+        """,
+        'foreign_keys': """
+            SELECT CONSTRAINT_NAME AS constraint_name, TABLE_NAME AS table_name, COLUMN_NAME AS column_name,
+                   REFERENCED_TABLE_SCHEMA AS referred_schema, REFERENCED_TABLE_NAME AS referred_table,
+                   REFERENCED_COLUMN_NAME AS referred_column
+            FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = :schema AND REFERENCED_TABLE_NAME IS NOT NULL {restrict}
+            ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+        """,
+    },
+    'mssql': {
+        'tables': """
+            SELECT t.name AS table_name
+            FROM sys.tables t
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            WHERE s.name = :schema {restrict}
+            ORDER BY t.name
+        """,
+        'columns': """
+            SELECT t.name AS table_name, c.name AS column_name, ty.name AS data_type,
+                   dc.definition AS column_default, c.is_nullable AS is_nullable,
+                   c.is_identity AS is_autoincrement
+            FROM sys.columns c
+            JOIN sys.tables t ON t.object_id = c.object_id
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+            LEFT JOIN sys.default_constraints dc ON dc.object_id = c.default_object_id
+            WHERE s.name = :schema {restrict}
+            ORDER BY t.name, c.column_id
+        """,
+        'primary_keys': """
+            SELECT t.name AS table_name, c.name AS column_name
+            FROM sys.indexes i
+            JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+            JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+            JOIN sys.tables t ON t.object_id = i.object_id
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            WHERE s.name = :schema AND i.is_primary_key = 1 {restrict}
+            ORDER BY t.name, ic.key_ordinal
+        """,
+        'foreign_keys': """
+            SELECT fk.name AS constraint_name, t.name AS table_name, pc.name AS column_name,
+                   rs.name AS referred_schema, rt.name AS referred_table, rc.name AS referred_column
+            FROM sys.foreign_key_columns fkc
+            JOIN sys.foreign_keys fk ON fk.object_id = fkc.constraint_object_id
+            JOIN sys.tables t ON t.object_id = fkc.parent_object_id
+            JOIN sys.schemas s ON s.schema_id = t.schema_id
+            JOIN sys.columns pc ON pc.object_id = fkc.parent_object_id AND pc.column_id = fkc.parent_column_id
+            JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+            JOIN sys.schemas rs ON rs.schema_id = rt.schema_id
+            JOIN sys.columns rc ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+            WHERE s.name = :schema {restrict}
+            ORDER BY t.name, fk.name, fkc.constraint_column_id
+        """,
+    },
+}
+
+# cheap "has anything changed" queries, their rows are hashed into a schema signal.
+# they read object level catalog rows only and never touch the tables themselves.
+# every row belongs to the table in its table_name column, the rows of tables a crawl skips are left out.
+SIGNAL_QUERIES = {
+    'postgresql': [
+        text("""
+            SELECT c.relname AS table_name, c.relfilenode::text AS created, c.xmin::text AS modified
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')
+            ORDER BY c.relname
+        """),
+        text("""
+            SELECT c.relname AS table_name, con.conname AS name, con.xmin::text AS modified
+            FROM pg_catalog.pg_constraint con
+            JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema
+            ORDER BY c.relname, con.conname
+        """),
+        text("""
+            SELECT c.relname AS table_name, count(*)::text AS columns, max(a.xmin::text::bigint)::text AS modified
+            FROM pg_catalog.pg_attribute a
+            JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') AND a.attnum > 0
+            GROUP BY c.relname
+            ORDER BY c.relname
+        """),
+    ],
+    'mysql': [
+        text("""
+            SELECT TABLE_NAME AS table_name, CREATE_TIME AS created
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = :schema
+            ORDER BY TABLE_NAME
+        """),
+        text("""
+            SELECT TABLE_NAME AS table_name, COUNT(*) AS columns,
+                   SUM(CRC32(CONCAT_WS('|', COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY,
+                                       COALESCE(COLUMN_DEFAULT, '')))) AS checksum
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = :schema
+            GROUP BY TABLE_NAME
+            ORDER BY TABLE_NAME
+        """),
+        text("""
+            SELECT TABLE_NAME AS table_name, CONSTRAINT_NAME AS name, REFERENCED_TABLE_NAME AS referred_table
+            FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = :schema
+            ORDER BY TABLE_NAME, CONSTRAINT_NAME
+        """),
+    ],
+    'mssql': [
+        text("""
+            SELECT COALESCE(p.name, o.name) AS table_name, o.name AS name,
+                   CONVERT(varchar(30), o.create_date, 126) AS created,
+                   CONVERT(varchar(30), o.modify_date, 126) AS modified
+            FROM sys.objects o
+            LEFT JOIN sys.objects p ON p.object_id = o.parent_object_id
+            WHERE o.schema_id = SCHEMA_ID(:schema) AND o.type IN ('U', 'PK', 'F', 'UQ', 'D')
+            ORDER BY COALESCE(p.name, o.name), o.name
+        """),
+    ],
+}
+
+# partitions listed as tables of their own, with the table they belong to. postgresql lists declarative
+# partitions and inheritance children as ordinary relations, mysql and mssql keep partitions inside their table.
+PARTITION_QUERIES = {
+    'postgresql': text("""
+        SELECT c.relname AS table_name, p.relname AS parent_name
+        FROM pg_catalog.pg_inherits i
+        JOIN pg_catalog.pg_class c ON c.oid = i.inhrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_catalog.pg_class p ON p.oid = i.inhparent
+        JOIN pg_catalog.pg_namespace pn ON pn.oid = p.relnamespace
+        WHERE n.nspname = :schema AND pn.nspname = :schema AND c.relkind IN ('r', 'p')
+        ORDER BY c.relname
+    """),
+}
+
+# condition leaving the partitions of PARTITION_QUERIES out of the catalog queries of a dialect,
+# so a crawl collapsing partitions never reads their columns
+PARTITION_EXCLUSIONS = {
+    'postgresql': """AND NOT EXISTS (SELECT 1 FROM pg_catalog.pg_inherits i
+                                     JOIN pg_catalog.pg_class p ON p.oid = i.inhparent
+                                     WHERE i.inhrelid = c.oid AND p.relnamespace = c.relnamespace)""",
+}
+
+# the table name every catalog query of a dialect is restricted on
+TABLE_NAME_COLUMNS = {
+    'postgresql': 'c.relname',
+    'mysql': 'TABLE_NAME',
+    'mssql': 't.name'
+}
+
+_TYPE_ARGS = re.compile(r'\(.*?\)')
+
+
+def supports(dialect_name):
+    return dialect_name in CATALOG_QUERIES
+
+
+def catalog_query(dialect_name, kind, table_names=None, exclude_partitions=False):
+    """
+    the catalog query of a kind of object, for the given tables only when table_names is given and
+    without the partitions of PARTITION_QUERIES when exclude_partitions is set
+    """
+    restrict = []
+    if table_names is not None:
+        restrict.append('AND %s IN :table_names' % TABLE_NAME_COLUMNS[dialect_name])
+    if exclude_partitions and dialect_name in PARTITION_EXCLUSIONS:
+        restrict.append(PARTITION_EXCLUSIONS[dialect_name])
+    query = text(CATALOG_QUERIES[dialect_name][kind].format(restrict=' '.join(restrict)))
+    if table_names is not None:
+        query = query.bindparams(bindparam('table_names', expanding=True))
+    return query
+
+
+def list_tables(connection, schema, exclude_partitions=False):
+    """names of the tables of a schema in a single query, None when the dialect has no catalog queries"""
+    if not supports(connection.dialect.name):
+        return None
+    query = catalog_query(connection.dialect.name, 'tables', exclude_partitions=exclude_partitions)
+    return [row['table_name'] for row in connection.execute(query, schema=schema)]
+
+
+def reflect_schema(connection, schema, table_names=None, exclude_partitions=False):
+    """
+    Reflect every table of a schema, or only table_names, with one query per kind of object.
+    Returns None when the dialect has no catalog queries, otherwise a dict holding the dependency
+    sorted table names and per table columns, primary keys and foreign keys shaped like the
+    Inspector's get_columns, get_pk_constraint and get_foreign_keys results.
+    """
+    dialect = connection.dialect
+    if not supports(dialect.name):
+        return None
+    queries = dict((kind, catalog_query(dialect.name, kind, table_names, exclude_partitions))
+                   for kind in ('tables', 'columns', 'primary_keys', 'foreign_keys'))
+    params = {'schema': schema}
+    if table_names is not None:
+        params['table_names'] = list(table_names)
+
+    table_names = [row['table_name'] for row in connection.execute(queries['tables'], **params)]
+    columns = OrderedDict((table_name, []) for table_name in table_names)
+    primary_keys = OrderedDict((table_name, []) for table_name in table_names)
+    foreign_keys = OrderedDict((table_name, []) for table_name in table_names)
+
+    for row in connection.execute(queries['columns'], **params):
+        if row['table_name'] in columns:
+            columns[row['table_name']].append(_column(dialect, row))
+
+    for row in connection.execute(queries['primary_keys'], **params):
+        if row['table_name'] in primary_keys:
+            primary_keys[row['table_name']].append(row['column_name'])
+
+    constraints = OrderedDict()
+    for row in connection.execute(queries['foreign_keys'], **params):
+        if row['table_name'] not in foreign_keys:
+            continue
+        key = (row['table_name'], row['constraint_name'])
+        if key not in constraints:
+            constraints[key] = {
+                'name': row['constraint_name'],
+                'constrained_columns': [],
+                'referred_schema': row['referred_schema'] if row['referred_schema'] != schema else None,
+                'referred_table': row['referred_table'],
+                'referred_columns': [],
+                'options': {}
+            }
+            foreign_keys[row['table_name']].append(constraints[key])
+        constraints[key]['constrained_columns'].append(row['column_name'])
+        constraints[key]['referred_columns'].append(row['referred_column'])
+
+    return {
+        'tables': sort_tables(table_names, foreign_keys),
+        'columns': columns,
+        'primary_keys': primary_keys,
+        'foreign_keys': foreign_keys
+    }
+
+
+def schema_signal(connection, schema, tables=None):
+    """
+    Digest of the catalog rows describing the schema's tables, columns and constraints, of the given
+    tables only when tables is given. Two equal signals mean those tables did not change in between.
+    None when the dialect has no signal queries.
+    """
+    queries = SIGNAL_QUERIES.get(connection.dialect.name)
+    if queries is None:
+        return None
+    digest = hashlib.sha1()
+    for query in queries:
+        for row in connection.execute(query, schema=schema):
+            if tables is not None and row['table_name'] not in tables:
+                continue
+            digest.update('|'.join(str(value) for value in row).encode('utf-8'))
+            digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def partitions(connection, schema):
+    """{partition: parent table} of the schema, empty when the dialect keeps partitions inside their table"""
+    query = PARTITION_QUERIES.get(connection.dialect.name)
+    if query is None:
+        return {}
+    return OrderedDict((row['table_name'], row['parent_name']) for row in connection.execute(query, schema=schema))
+
+
+def sort_tables(table_names, foreign_keys):
+    """Dependency order table names the same way Inspector.get_sorted_table_and_fkc_names does"""
+    tuples = set()
+    for table_name in table_names:
+        for fk in foreign_keys.get(table_name, []):
+            if table_name != fk['referred_table']:
+                tuples.add((fk['referred_table'], table_name))
+    try:
+        return list(topological.sort(tuples, table_names))
+    except exc.CircularDependencyError as err:
+        for edge in err.edges:
+            tuples.remove(edge)
+        return list(topological.sort(tuples, table_names))
+
+
+def _column(dialect, row):
+    default = row['column_default']
+    if dialect.name == 'postgresql':
+        autoincrement = default is not None and 'nextval(' in default
+    else:
+        autoincrement = bool(row['is_autoincrement'])
+    return {
+        'name': row['column_name'],
+        'type': _column_type(dialect, row['data_type']),
+        'default': default,
+        'nullable': bool(row['is_nullable']),
+        'autoincrement': autoincrement
+    }
+
+
+def _column_type(dialect, data_type):
+    if data_type.endswith('[]'):
+        return sqltypes.ARRAY
+    name = _TYPE_ARGS.sub('', data_type).strip()
+    coltype = dialect.ischema_names.get(name) or dialect.ischema_names.get(name.lower())
+    if coltype is None:
+        return sqltypes.NULLTYPE
+    try:
+        return coltype()
+    except TypeError:
+        return coltype
@@ -0,0 +1,69 @@
+import fnmatch
+import hashlib
+import json
+import re
+from collections import Counter
+
+# prefix of a pattern read as a regular expression, every other pattern is a glob
+REGEX_PREFIX = 're:'
+
+
+def compile_pattern(pattern):
+    """
+    a glob matches the whole name, case sensitive. a 're:' pattern is a regular expression searched
+    anywhere in the name, anchor it with ^ and $ to match whole names. raises re.error when invalid
+    """
+    if pattern.startswith(REGEX_PREFIX):
+        return re.compile(pattern[len(REGEX_PREFIX):])
+    return re.compile('^(?:%s)' % fnmatch.translate(pattern))
+
+
+class TableFilter(object):
+    """
+    Which listed tables of a schema a crawl reflects. Applied to the table listing, a skipped table
+    never costs a reflection round-trip. In order: partitions collapse into their parent table,
+    tables matching an exclude pattern are dropped, then those matching no include pattern, and
+    at most max_tables are kept, the first ones by name so the same tables survive every crawl.
+    Patterns are matched against the table name and against the schema qualified schema.table name.
+    """
+
+    def __init__(self, include=None, exclude=None, max_tables=None, collapse_partitions=True):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.max_tables = max_tables
+        self.collapse_partitions = collapse_partitions
+        self._include = [compile_pattern(pattern) for pattern in self.include]
+        self._exclude = [compile_pattern(pattern) for pattern in self.exclude]
+
+    @property
+    def key(self):
+        """digest of the settings, part of the schema signal so changing a filter triggers a crawl"""
+        payload = json.dumps([self.include, self.exclude, self.max_tables, bool(self.collapse_partitions)])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _matches(patterns, name, schema):
+        qualified = '%s.%s' % (schema, name) if schema else None
+        return any(pattern.search(name) or (qualified and pattern.search(qualified)) for pattern in patterns)
+
+    def apply(self, names, schema=None, partitions=None):
+        """
+        (kept names in the given order, Counter of skipped tables per reason) for the names listed in
+        a schema. partitions maps a partition to its parent table, see catalog.partitions
+        """
+        skipped = Counter()
+        kept = []
+        for name in names:
+            if self.collapse_partitions and partitions and name in partitions:
+                skipped['partitions'] += 1
+            elif self._exclude and self._matches(self._exclude, name, schema):
+                skipped['excluded'] += 1
+            elif self._include and not self._matches(self._include, name, schema):
+                skipped['not_included'] += 1
+            else:
+                kept.append(name)
+        if self.max_tables is not None and len(kept) > self.max_tables:
+            capped = set(sorted(kept)[:self.max_tables])
+            skipped['over_cap'] += len(kept) - self.max_tables
+            kept = [name for name in kept if name in capped]
+        return kept, skipped
@@ -0,0 +1,218 @@
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.models.database_graph import DatabaseGraph
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<III')
+
+
+def qualified_name(schema_name, table_name):
+    """the name of a table in the graph, prefixed by its schema unless it is in the default one"""
+    return table_name if schema_name is None else '%s.%s' % (schema_name, table_name)
+
+
+class SchemaGraph(object):
+    """
+    Undirected foreign key graph of one crawled database in compressed sparse row form.
+    Tables are numbered 0..n-1 in id order, the neighbours of table i are
+    targets[offsets[i]:offsets[i + 1]], each pair of tables is linked once however many
+    foreign keys join them.
+    """
+
+    def __init__(self, table_ids, table_names, offsets, targets):
+        self.table_ids = table_ids
+        self.table_names = table_names
+        self.offsets = offsets
+        self.targets = targets
+        self.positions = {table_id: position for position, table_id in enumerate(table_ids)}
+        self.names = {table_name: position for position, table_name in enumerate(table_names)}
+        self._components = None
+
+    @classmethod
+    def build(cls, session, database_id):
+        """read the tables and foreign keys of a database, two queries"""
+        rows = session.execute(select([Table.id, Table.table_name, Table.schema_name])
+                               .where(Table.database_id == database_id).order_by(Table.id)).fetchall()
+        table_ids = array('i', (row.id for row in rows))
+        positions = {table_id: position for position, table_id in enumerate(table_ids)}
+        neighbours = [set() for _ in rows]
+        query = select([ForeignKey.table_id, ForeignKey.referred_table_id]).distinct() \
+            .where(ForeignKey.table_id.in_(select([Table.id]).where(Table.database_id == database_id)))
+        for table_id, referred_table_id in session.execute(query):
+            source, target = positions.get(table_id), positions.get(referred_table_id)
+            if source is None or target is None or source == target:
+                continue
+            neighbours[source].add(target)
+            neighbours[target].add(source)
+        offsets = array('i', [0])
+        targets = array('i')
+        for adjacent in neighbours:
+            targets.extend(sorted(adjacent))
+            offsets.append(len(targets))
+        return cls(table_ids, [qualified_name(row.schema_name, row.table_name) for row in rows], offsets, targets)
+
+    def to_bytes(self):
+        arrays = [self.table_ids, self.offsets, self.targets]
+        if sys.byteorder == 'big':
+            arrays = [array('i', values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+        payload = HEADER.pack(FORMAT_VERSION, len(self.table_ids), len(self.targets)) + \
+            b''.join(values.tobytes() for values in arrays) + '\0'.join(self.table_names).encode('utf-8')
+        return zlib.compress(payload)
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = zlib.decompress(data)
+        version, tables, slots = HEADER.unpack_from(payload)
+        if version != FORMAT_VERSION:
+            raise ValueError('unsupported schema graph format %s' % version)
+        position = HEADER.size
+        arrays = []
+        for length in (tables, tables + 1, slots):
+            values = array('i')
+            values.frombytes(payload[position:position + length * values.itemsize])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            position += length * values.itemsize
+            arrays.append(values)
+        names = payload[position:].decode('utf-8').split('\0') if tables else []
+        return cls(arrays[0], names, arrays[1], arrays[2])
+
+    def __len__(self):
+        return len(self.table_ids)
+
+    @property
+    def edges(self):
+        return len(self.targets) // 2
+
+    def neighbours(self, position):
+        return self.targets[self.offsets[position]:self.offsets[position + 1]]
+
+    def position(self, table_name):
+        return self.names.get(table_name)
+
+    def shortest_path(self, source, target):
+        """
+        positions of the tables on a shortest join path from source to target, None when unconnected.
+        The search grows from both ends, always expanding the smaller frontier, so it meets halfway
+        instead of flooding the whole graph.
+        """
+        if source == target:
+            return [source]
+        forward, backward = {source: None}, {target: None}
+        forward_frontier, backward_frontier = [source], [target]
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand(forward_frontier, forward, backward)
+            else:
+                backward_frontier, meeting = self._expand(backward_frontier, backward, forward)
+            if meeting is not None:
+                path = [meeting]
+                while forward[path[0]] is not None:
+                    path.insert(0, forward[path[0]])
+                while backward[path[-1]] is not None:
+                    path.append(backward[path[-1]])
+                return path
+        return None
+
+    def _expand(self, frontier, previous, other):
+        reached = []
+        for current in frontier:
+            for neighbour in self.neighbours(current):
+                if neighbour in previous:
+                    continue
+                previous[neighbour] = current
+                if neighbour in other:
+                    return reached, neighbour
+                reached.append(neighbour)
+        return reached, None
+
+    def neighbourhood(self, source, hops):
+        """{position: distance} of the tables at most hops foreign keys away from source"""
+        distances = {source: 0}
+        frontier = [source]
+        for distance in range(1, hops + 1):
+            reached = []
+            for current in frontier:
+                for neighbour in self.neighbours(current):
+                    if neighbour not in distances:
+                        distances[neighbour] = distance
+                        reached.append(neighbour)
+            if not reached:
+                break
+            frontier = reached
+        return distances
+
+    def components(self):
+        """connected components as lists of positions, largest first, computed once per graph"""
+        if self._components is not None:
+            return self._components
+        seen = bytearray(len(self.table_ids))
+        components = []
+        for start in range(len(self.table_ids)):
+            if seen[start]:
+                continue
+            seen[start] = 1
+            component = [start]
+            stack = [start]
+            while stack:
+                for neighbour in self.neighbours(stack.pop()):
+                    if not seen[neighbour]:
+                        seen[neighbour] = 1
+                        component.append(neighbour)
+                        stack.append(neighbour)
+            components.append(sorted(component))
+        components.sort(key=lambda component: (-len(component), component[0]))
+        self._components = components
+        return components
+
+
+_loaded = OrderedDict()
+_lock = threading.Lock()
+
+
+def store_graph(session, database):
+    """build the graph of the database's stored metadata and persist it for its current crawl generation"""
+    graph = SchemaGraph.build(session, database.id)
+    record = session.query(DatabaseGraph).get(database.id) or DatabaseGraph(database_id=database.id)
+    record.crawl_generation = database.crawl_generation or 0
+    record.tables = len(graph)
+    record.edges = graph.edges
+    record.payload = graph.to_bytes()
+    record.built_at = datetime.utcnow()
+    session.add(record)
+    return graph
+
+
+def load_graph(session, database, cache_size=16):
+    """
+    the graph of the database's current crawl generation, kept decoded in a small per-process LRU.
+    graphs of crawls that predate the graph, or of a newer generation, are built and stored on the way.
+    """
+    key = (database.id, database.crawl_generation or 0)
+    with _lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            return _loaded[key]
+    record = session.query(DatabaseGraph).get(database.id)
+    if record is not None and record.crawl_generation == key[1]:
+        graph = SchemaGraph.from_bytes(record.payload)
+    else:
+        graph = store_graph(session, database)
+        session.commit()
+    with _lock:
+        _loaded[key] = graph
+        while len(_loaded) > cache_size:
+            _loaded.popitem(last=False)
+    return graph
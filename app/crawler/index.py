@@ -0,0 +1,65 @@
+from sqlalchemy import select
+
+from app.models.column import Column
+from app.models.table import Table
+
+
+class MetadataIndex(object):
+    """
+    In-memory name to id lookups for the stored rows of one crawled database,
+    filled while the rows are inserted so foreign keys resolve without extra queries.
+    Tables are looked up by name and schema, None standing for the default schema.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.columns = {}
+
+    @classmethod
+    def load(cls, session, database_id):
+        """index rows that are already stored, two queries regardless of schema size"""
+        index = cls()
+        query = select([Table.id, Table.table_name, Table.schema_name]).where(Table.database_id == database_id)
+        for row in session.execute(query):
+            index.add_table(row.table_name, row.id, row.schema_name)
+        query = select([Column.id, Column.table_id, Column.column_name]) \
+            .select_from(Column.__table__.join(Table.__table__, Column.table_id == Table.id)) \
+            .where(Table.database_id == database_id)
+        for row in session.execute(query):
+            index.add_column(row.table_id, row.column_name, row.id)
+        return index
+
+    def add_table(self, table_name, table_id, schema=None):
+        self.tables[(schema, table_name)] = table_id
+
+    def add_column(self, table_id, column_name, column_id):
+        self.columns[(table_id, column_name)] = column_id
+
+    def table_id(self, table_name, schema=None):
+        return self.tables.get((schema, table_name))
+
+    def column_id(self, table_id, column_name):
+        return self.columns.get((table_id, column_name))
+
+    def resolve(self, table_name, column_name, fk, schema=None):
+        """
+        ForeignKey rows for column_name of table_name taking part in the Inspector style fk dict.
+        Every constrained column of a composite key is paired with the referred column at the same position.
+        Returns None when the referred table or column is not stored.
+        """
+        table_id = self.table_id(table_name, schema)
+        referred_table_id = self.table_id(fk['referred_table'], fk.get('referred_schema'))
+        rows = []
+        for constrained, referred in zip(fk['constrained_columns'], fk['referred_columns']):
+            if constrained != column_name:
+                continue
+            referred_column_id = self.column_id(referred_table_id, referred)
+            if referred_column_id is None:
+                return None
+            rows.append({
+                'column_id': self.column_id(table_id, column_name),
+                'table_id': table_id,
+                'referred_column_id': referred_column_id,
+                'referred_table_id': referred_table_id
+            })
+        return rows
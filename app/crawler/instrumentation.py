@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from sqlalchemy import event
+
+
+def snapshot_rows(snapshot):
+    """tables, columns and foreign keys reflected into a snapshot"""
+    rows = Counter(tables=len(snapshot))
+    for table in snapshot:
+        rows['columns'] += len(table.columns)
+        rows['foreign_keys'] += len(table.foreign_keys)
+    return dict(rows)
+
+
+class CrawlInstrumentation(object):
+    """
+    Where the time of one crawl goes. Stages are laps of a wall clock, entering a stage ends the
+    previous one, so the writer's on_stage callback times the table, column and foreign key writes
+    without any extra call. Statements sent to the metadata store are counted per stage by an event
+    listener on its engine, restricted to the crawling thread. The cost is a clock read per stage
+    and a counter increment per statement, cheap enough to leave on.
+    """
+
+    def __init__(self, engine=None, on_stage=None):
+        self.engine = engine
+        self.on_stage = on_stage
+        self.thread = threading.get_ident()
+        self.started = time.time()
+        self.stage_name = 'setup'
+        self.stage_started = self.started
+        self.stages = OrderedDict()
+        self.statements = Counter()
+        self.seconds = None
+        if engine is not None:
+            event.listen(engine, 'before_cursor_execute', self._count_statement)
+
+    def _count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread:
+            self.statements[self.stage_name] += 1
+
+    def _lap(self, now):
+        self.stages[self.stage_name] = self.stages.get(self.stage_name, 0.0) + now - self.stage_started
+        self.stage_started = now
+
+    def stage(self, name):
+        """enter a named stage, passed on to on_stage e.g. the task's progress reporter"""
+        if self.seconds is None and name != self.stage_name:
+            self._lap(time.time())
+            self.stage_name = name
+        if self.on_stage is not None:
+            self.on_stage(name)
+
+    def finish(self):
+        """end the last stage and stop counting statements, later calls are no-ops"""
+        if self.seconds is None:
+            now = time.time()
+            self._lap(now)
+            self.seconds = now - self.started
+            if self.engine is not None:
+                event.remove(self.engine, 'before_cursor_execute', self._count_statement)
+                self.engine = None
+        return self
+
+    def report(self, reflection=None, rows=None, persistence=None, progress=None):
+        """
+        the crawl's figures as plain json: wall time per stage, statements sent to the metadata store
+        and, when given, remote round-trips and call timings, tables the crawl filters skipped, reflected
+        rows, rows written and the cost of the task's state updates
+        """
+        self.finish()
+        report = OrderedDict()
+        report['seconds'] = round(self.seconds, 3)
+        report['stages'] = OrderedDict((name, round(seconds, 3)) for name, seconds in self.stages.items())
+        report['statements'] = sum(self.statements.values())
+        report['statements_by_stage'] = dict(self.statements)
+        if reflection is not None:
+            report['round_trips'] = reflection['round_trips']
+            report['remote_calls'] = reflection['calls']
+            report['remote_seconds'] = reflection['seconds']
+            if 'skipped' in reflection:
+                report['skipped'] = reflection['skipped']
+        if rows is not None:
+            report['rows'] = rows
+        if persistence is not None:
+            report['rows_written'] = persistence['rows']
+        if progress is not None:
+            report['state_updates'] = progress
+        return report
+
+
+def merge_reports(reports, report):
+    """
+    add up the reports of the chunks of a distributed crawl into the report of its callback.
+    the chunks ran side by side, so their stage times are summed work rather than wall time
+    """
+    merged = OrderedDict(report)
+    stages = OrderedDict()
+    statements = Counter(report.get('statements_by_stage', {}))
+    remote_calls, remote_seconds, rows, state_updates = Counter(), Counter(), Counter(), Counter()
+    round_trips = rows_written = 0
+    for chunk in list(reports) + [report]:
+        for name, seconds in chunk.get('stages', {}).items():
+            stages[name] = round(stages.get(name, 0.0) + seconds, 3)
+        if chunk is not report:
+            statements.update(chunk.get('statements_by_stage', {}))
+        remote_calls.update(chunk.get('remote_calls', {}))
+        remote_seconds.update(chunk.get('remote_seconds', {}))
+        rows.update(chunk.get('rows', {}))
+        state_updates.update(chunk.get('state_updates', {}))
+        round_trips += chunk.get('round_trips', 0)
+        rows_written += chunk.get('rows_written', 0)
+    merged['stages'] = stages
+    merged['statements'] = sum(statements.values())
+    merged['statements_by_stage'] = dict(statements)
+    merged['round_trips'] = round_trips
+    merged['remote_calls'] = dict(remote_calls)
+    merged['remote_seconds'] = dict((kind, round(seconds, 3)) for kind, seconds in remote_seconds.items())
+    merged['rows'] = dict(rows)
+    merged['rows_written'] = rows_written
+    merged['state_updates'] = dict((name, round(value, 3)) for name, value in state_updates.items())
+    merged['chunks'] = len(reports)
+    return merged
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+
+
+def progress_channel(task_id):
+    return 'progress:%s' % task_id
+
+
+def redis_client(url):
+    """one client per url and process, None when progress events are switched off"""
+    if not url:
+        return None
+    if url not in _clients:
+        import redis
+        _clients[url] = redis.StrictRedis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+    return _clients[url]
+
+
+def publish(client, task_id, state, meta):
+    """push a progress event to the stream subscribers of a task, never fails the task"""
+    if client is None or task_id is None:
+        return
+    try:
+        client.publish(progress_channel(task_id), json.dumps(dict(meta, state=state), default=str))
+    except Exception as e:
+        logger.warning('progress event of task %s not published: %s', task_id, e)
+
+
+class ProgressReporter(object):
+    """
+    Coalescing progress of a running task. Updates only change the reporter's state, which is stored in
+    the result backend and published to the task's progress channel when min_interval seconds passed or
+    the completed fraction moved by min_delta since the last flush, and once whenever a stage begins.
+    A crawl costs a few hundred writes instead of one per chunk. Flushed progress carries the stage, the
+    steps per second of the current total and the seconds left at that rate.
+    """
+
+    def __init__(self, task, client=None, min_interval=0.5, min_delta=0.01):
+        self.task = task
+        self.client = client
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.current = 0
+        self.total = 100
+        self.status = 'pending'
+        self.stage_name = None
+        # independently budgeted parts of the task, e.g. the schemas of a crawl
+        self.parts = OrderedDict()
+        self.counted_from = (time.time(), 0)
+        self.last_time = None
+        self.last_fraction = None
+        # an update was coalesced and not flushed yet
+        self.pending = False
+        self.sent = 0
+        self.skipped = 0
+        # time spent storing and publishing flushed progress
+        self.seconds = 0.0
+
+    def update(self, current=None, total=None, status=None, force=False):
+        if total is not None and total != self.total:
+            self.total = total
+            # a new total starts a new measurement, the steps so far were counted against another unit
+            self.counted_from = (time.time(), self.current if current is None else current)
+        if current is not None:
+            self.current = min(current, self.total)
+        if status is not None:
+            self.status = status
+        return self.flush(force)
+
+    def advance(self, steps):
+        """count steps done, the writer's on_progress callback"""
+        return self.update(self.current + steps)
+
+    def stage(self, name):
+        """enter a named stage, the writer's on_stage callback; a new stage is flushed once with the progress so far"""
+        if self.stage_name == name:
+            return self.flush()
+        self.stage_name = name
+        return self.flush(force=True)
+
+    def add_parts(self, names, **state):
+        """register named parts of the task, they go out with the next flush"""
+        for name in names:
+            self.parts.setdefault(name, {}).update(state)
+        self.pending = True
+
+    def part(self, name, **state):
+        """update the state of a named part of the task, every part change is flushed"""
+        self.parts.setdefault(name, {}).update(state)
+        return self.flush(force=True)
+
+    @property
+    def rate(self):
+        started, counted = self.counted_from
+        elapsed = time.time() - started
+        if elapsed <= 0 or self.current <= counted:
+            return None
+        return (self.current - counted) / elapsed
+
+    @property
+    def eta(self):
+        rate = self.rate
+        if not rate:
+            return None
+        return (self.total - self.current) / rate
+
+    @property
+    def meta(self):
+        meta = {'current': self.current, 'total': self.total, 'status': self.status}
+        if self.stage_name is not None:
+            meta['stage'] = self.stage_name
+        if self.parts:
+            meta['parts'] = OrderedDict((name, dict(state)) for name, state in self.parts.items())
+        rate = self.rate
+        if rate is not None:
+            meta['rows_per_second'] = round(rate, 1)
+            meta['eta_seconds'] = round(self.eta, 1)
+        return meta
+
+    def flush(self, force=False):
+        now = time.time()
+        fraction = float(self.current) / self.total if self.total else 0.0
+        if not force and self.last_time is not None and self.current < self.total and \
+                now - self.last_time < self.min_interval and abs(fraction - self.last_fraction) < self.min_delta:
+            self.skipped += 1
+            self.pending = True
+            return False
+        meta = self.meta
+        self.task.update_state(state='PROGRESS', meta=meta)
+        publish(self.client, self.task.request.id, 'PROGRESS', meta)
+        self.seconds += time.time() - now
+        self.last_time = now
+        self.last_fraction = fraction
+        self.pending = False
+        self.sent += 1
+        return True
+
+    @property
+    def stats(self):
+        return {'sent': self.sent, 'skipped': self.skipped, 'seconds': round(self.seconds, 3)}
@@ -0,0 +1,279 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine.reflection import Inspector
+
+from app.crawler import catalog
+
+logger = logging.getLogger(__name__)
+
+# schemas of the database engines themselves, never crawled unless allow-listed
+SYSTEM_SCHEMAS = {
+    'postgresql': ('information_schema', 'pg_catalog', 'pg_toast'),
+    'mssql': ('information_schema', 'sys', 'guest', 'db_owner', 'db_accessadmin', 'db_securityadmin',
+              'db_ddladmin', 'db_backupoperator', 'db_datareader', 'db_datawriter', 'db_denydatareader',
+              'db_denydatawriter')
+}
+
+
+class ReflectionSession(object):
+    """
+    One pooled engine and one caching inspector shared by every stage of a crawl.
+    Use it as a context manager so it stops counting round-trips when the crawl finishes, the engine
+    itself belongs to the engine registry and stays warm for the next crawl.
+    With bulk enabled a whole schema is read through set-based catalog queries on first use,
+    tables or dialects the catalog does not cover fall back to the per table Inspector calls.
+    Every method takes the schema to read, None is the connection's default schema.
+    A table_filter, see app.crawler.filters, is applied to every table listing, tables it skips are
+    never reflected and are counted per reason in stats.
+    """
+
+    def __init__(self, engine, bulk=True, table_filter=None):
+        self.engine = engine
+        self.bulk = bulk
+        self.table_filter = table_filter
+        self._catalogs = {}
+        self._listings = {}
+        self._partitions = {}
+        self._counted = set()
+        self.round_trips = 0
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.skipped = Counter()
+        # threads inside a remote call of this session, the engine is shared with other crawls and pings
+        self._threads = Counter()
+        self._lock = threading.Lock()
+        event.listen(self.engine, 'before_cursor_execute', self._count_round_trip)
+        self.inspector = Inspector.from_engine(self.engine)
+        self.schema = self.inspector.default_schema_name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.dispose()
+
+    def _count_round_trip(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            if self._threads[threading.get_ident()]:
+                self.round_trips += 1
+
+    @contextmanager
+    def _count(self, kind):
+        """count a remote call, the wall time it takes and the round-trips its thread makes meanwhile"""
+        thread = threading.get_ident()
+        started = time.time()
+        with self._lock:
+            self._threads[thread] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[thread] -= 1
+                if not self._threads[thread]:
+                    del self._threads[thread]
+                self.calls[kind] += 1
+                self.seconds[kind] += time.time() - started
+
+    def _schema(self, schema):
+        return schema if schema is not None else self.schema
+
+    def stored_schema(self, schema):
+        """the schema as recorded on stored tables, None for the default schema"""
+        return None if schema is None or schema == self.schema else schema
+
+    def _load_catalog(self, schema=None, table_names=None):
+        schema = self._schema(schema)
+        if schema not in self._catalogs:
+            self._catalogs[schema] = {}
+            if self.bulk and catalog.supports(self.engine.dialect.name):
+                try:
+                    with self._count('catalog'), self.engine.connect() as connection:
+                        tables = catalog.reflect_schema(connection, schema, table_names,
+                                                        exclude_partitions=self._collapses_partitions) or {}
+                except exc.DBAPIError as e:
+                    logger.warning('catalog reflection of %s failed, falling back to inspector: %s', schema, e)
+                    tables = {}
+                if tables and self.table_filter is not None:
+                    names = self._filter(tables['tables'], schema, partitions_listed=False)
+                    tables = dict([(kind, dict((name, tables[kind][name]) for name in names))
+                                   for kind in ('columns', 'primary_keys', 'foreign_keys')], tables=names)
+                self._catalogs[schema] = tables
+        return self._catalogs[schema]
+
+    def load_tables(self, table_names, schema=None):
+        """
+        read only table_names of the schema through the catalog queries, the session then covers those
+        tables alone. for a crawl split into chunks, where every chunk reading the whole schema would
+        defeat the split. a no-op once the schema is loaded
+        """
+        self._load_catalog(schema, table_names=list(table_names))
+
+    @property
+    def _collapses_partitions(self):
+        """whether the catalog queries leave out the partitions the table filter collapses"""
+        return self.table_filter is not None and self.table_filter.collapse_partitions \
+            and self.engine.dialect.name in catalog.PARTITION_EXCLUSIONS
+
+    def _filter(self, names, schema, partitions_listed=True):
+        """
+        the names the table filter keeps, what it skipped is counted once per schema. partitions_listed
+        is False for names out of catalog queries that already left the partitions out
+        """
+        if schema not in self._partitions:
+            self._partitions[schema] = self.get_partitions(schema) if self.table_filter.collapse_partitions else None
+        partitions = self._partitions[schema]
+        if partitions_listed or not self._collapses_partitions:
+            names, skipped = self.table_filter.apply(names, schema, partitions)
+        else:
+            names, skipped = self.table_filter.apply(names, schema)
+            if partitions:
+                skipped['partitions'] += len(partitions)
+        with self._lock:
+            if schema not in self._counted:
+                self._counted.add(schema)
+                self.skipped.update(skipped)
+        return names
+
+    def _listed(self, schema=None):
+        """
+        names of the tables of the schema passed through the table filter, listed once per schema in
+        a single round-trip, through the catalog when the dialect has one so nothing else is read
+        """
+        schema = self._schema(schema)
+        if schema not in self._listings:
+            names, partitions_listed = None, True
+            if self.bulk and catalog.supports(self.engine.dialect.name):
+                try:
+                    with self._count('tables'), self.engine.connect() as connection:
+                        names = sorted(catalog.list_tables(connection, schema,
+                                                           exclude_partitions=self._collapses_partitions))
+                    partitions_listed = False
+                except exc.DBAPIError as e:
+                    logger.warning('catalog listing of %s failed, falling back to inspector: %s', schema, e)
+            if names is None:
+                with self._count('tables'):
+                    names = sorted(self.inspector.get_table_names(schema=schema))
+            self._listings[schema] = self._filter(names, schema, partitions_listed) \
+                if self.table_filter is not None else names
+        return self._listings[schema]
+
+    def bulk_loaded(self, schema=None):
+        """whether the tables of the schema came from the catalog queries"""
+        return bool(self._load_catalog(schema))
+
+    def _from_catalog(self, kind, table_name, schema):
+        return self._load_catalog(schema).get(kind, {}).get(table_name)
+
+    def get_schema_names(self):
+        """every schema of the database but those of the database engine itself"""
+        system = SYSTEM_SCHEMAS.get(self.engine.dialect.name, ())
+        with self._count('schemas'):
+            names = self.inspector.get_schema_names()
+        return [name for name in names if name not in system and not name.startswith('pg_')]
+
+    def get_partitions(self, schema=None):
+        """{partition: parent table} of the schema, no round-trip when the dialect has no partition tables"""
+        if self.engine.dialect.name not in catalog.PARTITION_QUERIES:
+            return {}
+        with self._count('partitions'), self.engine.connect() as connection:
+            return catalog.partitions(connection, self._schema(schema))
+
+    def get_table_names(self, dependency_order=True, schema=None):
+        """
+        Table names of the schema the table filter keeps. Without dependency_order the listing costs
+        a single round-trip and reads nothing else, the caller sorts the names itself if it needs to.
+        With a filter only the foreign keys of the kept tables are read to sort them.
+        """
+        if not dependency_order and self._schema(schema) not in self._catalogs:
+            return list(self._listed(schema))
+        tables = self._load_catalog(schema)
+        if tables:
+            return list(tables['tables'])
+        if not dependency_order:
+            return list(self._listed(schema))
+        if self.table_filter is not None:
+            names = self._listed(schema)
+            return catalog.sort_tables(names, dict((name, self.get_foreign_keys(name, schema)) for name in names))
+        with self._count('tables'):
+            tables = []
+            for tt in self.inspector.get_sorted_table_and_fkc_names(schema=self._schema(schema)):
+                if tt[0] is not None:
+                    tables.append(tt[0])
+            return tables
+
+    def get_columns(self, table_name, schema=None):
+        columns = self._from_catalog('columns', table_name, schema)
+        if columns is not None:
+            return columns
+        with self._count('columns'):
+            return self.inspector.get_columns(table_name=table_name, schema=self._schema(schema))
+
+    def get_primary_keys(self, table_name, schema=None):
+        primary_keys = self._from_catalog('primary_keys', table_name, schema)
+        if primary_keys is not None:
+            return primary_keys
+        with self._count('primary_keys'):
+            return self.inspector.get_pk_constraint(table_name=table_name, schema=self._schema(schema)) \
+                .get('constrained_columns', [])
+
+    def get_foreign_keys(self, table_name, schema=None):
+        """
+        foreign keys of the table, their referred_schema is the schema as recorded on stored tables
+        so keys into the default schema and keys within another schema resolve the same way
+        """
+        foreign_keys = self._from_catalog('foreign_keys', table_name, schema)
+        if foreign_keys is None:
+            with self._count('foreign_keys'):
+                foreign_keys = self.inspector.get_foreign_keys(table_name=table_name, schema=self._schema(schema))
+        return [dict(fk, referred_schema=self.stored_schema(fk.get('referred_schema') or self._schema(schema)))
+                for fk in foreign_keys]
+
+    def get_schema_signal(self, schemas=None):
+        """
+        cheap digest of the catalog rows of the schemas, the default schema when none are given, over
+        the tables the table filter keeps. None when the dialect does not support one
+        """
+        if not catalog.supports(self.engine.dialect.name):
+            return None
+        schemas = [self._schema(schema) for schema in schemas or [None]]
+        try:
+            # with a filter only the tables it keeps count, churn in skipped tables is no change
+            kept = dict((schema, set(self._listed(schema)) if self.table_filter is not None else None)
+                        for schema in schemas)
+            with self._count('signal'), self.engine.connect() as connection:
+                signals = [catalog.schema_signal(connection, schema, kept[schema]) for schema in schemas]
+        except exc.DBAPIError as e:
+            logger.warning('schema signal unavailable: %s', e)
+            return None
+        if len(signals) == 1 and self.table_filter is None:
+            return signals[0]
+        digest = hashlib.sha1()
+        for schema, signal in sorted(zip(schemas, signals)):
+            digest.update(('%s:%s\n' % (schema, signal)).encode('utf-8'))
+        if self.table_filter is not None:
+            # the filter decides what is stored, changing it has to look like a changed schema
+            digest.update(('filter:%s\n' % self.table_filter.key).encode('utf-8'))
+        return digest.hexdigest()
+
+    @property
+    def stats(self):
+        stats = {
+            'round_trips': self.round_trips,
+            'calls': dict(self.calls),
+            'seconds': dict((kind, round(seconds, 3)) for kind, seconds in self.seconds.items())
+        }
+        if self.table_filter is not None:
+            stats['skipped'] = dict(self.skipped)
+        return stats
+
+    def dispose(self):
+        if self.engine is None:
+            return
+        event.remove(self.engine, 'before_cursor_execute', self._count_round_trip)
+        self.engine = None
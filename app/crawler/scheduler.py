@@ -0,0 +1,71 @@
+from collections import Counter
+
+
+def is_in_flight(database, now, timeout):
+    """a refresh was enqueued and has neither finished nor timed out"""
+    return database.refresh_enqueued_at is not None and \
+        (now - database.refresh_enqueued_at).total_seconds() < timeout
+
+
+def staleness(database, now):
+    """seconds since the last crawl, None for databases that were never crawled successfully"""
+    if database.last_crawled_at is None:
+        return None
+    return (now - database.last_crawled_at).total_seconds()
+
+
+def is_backing_off(database, now, backoff, max_backoff):
+    """
+    the last crawls failed and the next attempt waits, backoff seconds after the first failure
+    doubling with every further one up to max_backoff
+    """
+    if not database.crawl_failures or database.last_attempted_at is None:
+        return False
+    wait = min(max_backoff, backoff * 2 ** (database.crawl_failures - 1))
+    return (now - database.last_attempted_at).total_seconds() < wait
+
+
+def priority(database, now):
+    """
+    databases whose last crawl succeeded before failing ones, then stale databases first,
+    and among equally stale ones the cheaper crawls
+    """
+    healthy = not database.crawl_failures
+    age = staleness(database, now)
+    if age is None:
+        return healthy, float('inf')
+    return healthy, age / (1.0 + (database.last_crawl_seconds or 0.0))
+
+
+def plan_refreshes(databases, now, interval, tick, max_per_host, max_per_tick, timeout, backoff=300,
+                   max_backoff=86400):
+    """
+    Pick the databases to refresh on this scheduler tick.
+    Returns (database, countdown) pairs, at most max_per_tick of them, never more than max_per_host
+    crawls in flight against the same host, with countdowns spread evenly over the tick.
+    Databases whose crawls keep failing are retried with an exponential backoff, see is_backing_off.
+    """
+    databases = list(databases)
+    in_flight = Counter(database.hostname for database in databases if is_in_flight(database, now, timeout))
+    due = []
+    for database in databases:
+        if database.status == 'pending' or is_in_flight(database, now, timeout):
+            continue
+        if is_backing_off(database, now, backoff, max_backoff):
+            continue
+        age = staleness(database, now)
+        if age is not None and age < interval:
+            continue
+        due.append(database)
+    due.sort(key=lambda database: priority(database, now) + (-database.id,), reverse=True)
+
+    planned = []
+    for database in due:
+        if len(planned) >= max_per_tick:
+            break
+        if in_flight[database.hostname] >= max_per_host:
+            continue
+        in_flight[database.hostname] += 1
+        planned.append(database)
+    step = float(tick) / len(planned) if planned else 0
+    return [(database, round(position * step, 1)) for position, database in enumerate(planned)]
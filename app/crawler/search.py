@@ -0,0 +1,198 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from sqlalchemy import exists, func, literal, select, union
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.crawler.writer import chunks
+from app.models.column import Column
+from app.models.database import Database
+from app.models.search_term import SearchTerm
+from app.models.table import Table
+
+# inserts skipping the terms the unique index already holds, other crawls may add the same names meanwhile
+INSERT_IGNORING_DUPLICATES = {
+    'postgresql': lambda table: postgresql.insert(table).on_conflict_do_nothing(index_elements=['term']),
+    'mysql': lambda table: table.insert().prefix_with('IGNORE'),
+    'sqlite': lambda table: table.insert().prefix_with('OR IGNORE'),
+}
+
+
+def trigrams(name):
+    """distinct trigrams of a lower cased name padded like pg_trgm, so prefixes weigh more than inner matches"""
+    padded = '  ' + name.lower() + ' '
+    return set(padded[position:position + 3] for position in range(len(padded) - 2))
+
+
+class TermIndex(object):
+    """
+    In-process trigram postings over the search vocabulary. A term gets a new id whenever it is added
+    to search_terms, so a refresh reads the rows added since the last one, whichever process crawled
+    them. Ids are handed out on insert but show up on commit, so a refresh reads the last overlap ids
+    again and every rebuild_seconds the whole vocabulary, a term committed behind a later id is picked
+    up either way. Pruned terms stay in the postings until the process restarts, they match no rows.
+    """
+
+    def __init__(self, overlap=1000, rebuild_seconds=600):
+        self.overlap = overlap
+        self.rebuild_seconds = rebuild_seconds
+        self.terms = []
+        self.known = set()
+        self.sizes = array('i')
+        self.postings = defaultdict(lambda: array('i'))
+        self.last_id = 0
+        self.rebuilt_at = time.time()
+        self.lock = threading.Lock()
+
+    def refresh(self, session):
+        after = max(0, self.last_id - self.overlap)
+        if time.time() - self.rebuilt_at >= self.rebuild_seconds:
+            after = 0
+            self.rebuilt_at = time.time()
+        rows = session.execute(select([SearchTerm.id, SearchTerm.term]).where(SearchTerm.id > after)
+                               .order_by(SearchTerm.id)).fetchall()
+        with self.lock:
+            for row in rows:
+                self.last_id = max(self.last_id, row.id)
+                if row.term in self.known:
+                    continue
+                self.known.add(row.term)
+                position = len(self.terms)
+                grams = trigrams(row.term)
+                self.terms.append(row.term)
+                self.sizes.append(len(grams))
+                for gram in grams:
+                    self.postings[gram].append(position)
+
+    def similar(self, query, min_similarity, limit):
+        """[(term, similarity)] best first, similarity is the Jaccard index of the trigram sets"""
+        query_trigrams = trigrams(query)
+        with self.lock:
+            shared = Counter()
+            for gram in query_trigrams:
+                if gram in self.postings:
+                    shared.update(self.postings[gram])
+            size = len(query_trigrams)
+            least = max(1, int(size * min_similarity))
+            scores = []
+            for position, count in shared.items():
+                if count < least:
+                    continue
+                score = float(count) / (self.sizes[position] + size - count)
+                if score >= min_similarity:
+                    scores.append((score, self.terms[position]))
+        best = heapq.nlargest(limit, scores, key=lambda item: (item[0], -len(item[1])))
+        return [(term, score) for score, term in best]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+term_index = TermIndex()
+
+
+def insert_terms(session, names):
+    """
+    insert names into the vocabulary, returns how many were added. a name another crawl inserted
+    in the meantime is skipped by the unique index instead of failing the crawl
+    """
+    table = SearchTerm.__table__
+    insert = INSERT_IGNORING_DUPLICATES.get(session.get_bind().dialect.name)
+    if insert is not None:
+        return session.execute(insert(table).values([{'term': name} for name in names])).rowcount
+    added = 0
+    for name in names:
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(term=name))
+            added += 1
+        except IntegrityError:
+            pass
+    return added
+
+
+def index_names(session, names, chunk_size=1000):
+    """add the names the vocabulary does not know yet, returns how many were added"""
+    names = sorted(set(name for name in names if name))
+    known = set()
+    for chunk in chunks(names, chunk_size):
+        known.update(term for term, in session.execute(select([SearchTerm.term]).where(SearchTerm.term.in_(chunk))))
+    new = [name for name in names if name not in known]
+    return sum(insert_terms(session, chunk) for chunk in chunks(new, chunk_size))
+
+
+def prune_names(session, names, chunk_size=1000):
+    """remove the names no stored table or column carries any more from the vocabulary, returns how many"""
+    names = sorted(set(name for name in names if name))
+    table_named = exists().where(Table.table_name == SearchTerm.term)
+    column_named = exists().where(Column.column_name == SearchTerm.term)
+    removed = 0
+    for chunk in chunks(names, chunk_size):
+        statement = SearchTerm.__table__.delete().where(SearchTerm.term.in_(chunk)) \
+            .where(~table_named).where(~column_named)
+        removed += session.execute(statement).rowcount
+    return removed
+
+
+def database_names(session, database_id):
+    """distinct table and column names stored for a database"""
+    table_names = select([Table.table_name]).where(Table.database_id == database_id)
+    column_names = select([Column.column_name]).select_from(Column.__table__.join(Table.__table__)) \
+        .where(Table.database_id == database_id)
+    return [name for name, in session.execute(union(table_names, column_names))]
+
+
+def index_database(session, database_id, chunk_size=1000):
+    """index the table and column names of a crawled database, terms are shared by all databases"""
+    return index_names(session, database_names(session, database_id), chunk_size)
+
+
+def search(session, query, kind=None, column_type=None, database_id=None, limit=20, max_terms=50,
+           min_similarity=0.3):
+    """
+    tables and columns whose name is similar to the query, ranked by similarity then by database,
+    table and column id. Terms are looked up best first, equally similar terms together, until the
+    page is full, so a popular but poorly matching name is never fetched for a full page of better ones.
+    """
+    term_index.refresh(session)
+    groups = []
+    for term, score in term_index.similar(query, min_similarity, max_terms):
+        if groups and groups[-1][0] == score:
+            groups[-1][1].append(term)
+        else:
+            groups.append((score, [term]))
+
+    results = []
+    for score, terms in groups:
+        statements = []
+        if kind in (None, 'table') and column_type is None:
+            statements.append((select([literal('table').label('kind'), Database.id.label('database_id'),
+                                      Database.dbname, Table.id.label('table_id'), Table.table_name,
+                                      literal(None).label('column_id'), literal(None).label('column_name'),
+                                      literal(None).label('column_type')])
+                              .select_from(Table.__table__.join(Database.__table__))
+                              .where(Table.table_name.in_(terms)), [Database.id, Table.id]))
+        if kind in (None, 'column'):
+            statement = select([literal('column').label('kind'), Database.id.label('database_id'),
+                                Database.dbname, Table.id.label('table_id'), Table.table_name,
+                                Column.id.label('column_id'), Column.column_name, Column.column_type]) \
+                .select_from(Column.__table__.join(Table.__table__).join(Database.__table__)) \
+                .where(Column.column_name.in_(terms))
+            if column_type is not None:
+                statement = statement.where(func.lower(Column.column_type) == column_type.lower())
+            statements.append((statement, [Database.id, Table.id, Column.id]))
+        found = []
+        for statement, order in statements:
+            if database_id is not None:
+                statement = statement.where(Database.id == database_id)
+            statement = statement.order_by(*order).limit(limit - len(results))
+            found.extend(dict(row, score=round(score, 4)) for row in session.execute(statement))
+        found.sort(key=lambda result: (result['database_id'], result['table_id'], result['column_id'] or 0))
+        results.extend(found[:limit - len(results)])
+        if len(results) >= limit:
+            break
+    return results
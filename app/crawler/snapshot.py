@@ -0,0 +1,136 @@
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.crawler.catalog import sort_tables
+
+
+class TableSnapshot(object):
+    """Reflected columns, primary keys and foreign keys of a single remote table"""
+
+    def __init__(self, name, columns, primary_keys, foreign_keys, schema=None):
+        self.name = name
+        self.columns = columns
+        self.primary_keys = primary_keys
+        self.foreign_keys = foreign_keys
+        # as recorded on the stored table, None for the default schema
+        self.schema = schema
+
+    def __repr__(self):
+        return '<TableSnapshot %r>' % self.name
+
+    @property
+    def key(self):
+        return self.schema, self.name
+
+    @property
+    def fingerprint(self):
+        """hash of the columns, types, primary keys and foreign keys, equal fingerprints mean nothing to write"""
+        columns = [[column.get('name'), str(getattr(column.get('type'), '__visit_name__', None)),
+                    column.get('default'), bool(column.get('nullable', True)),
+                    bool(column.get('autoincrement', False))] for column in self.columns]
+        foreign_keys = sorted([fk['constrained_columns'], fk['referred_table'], fk['referred_columns']]
+                              for fk in self.foreign_keys)
+        payload = json.dumps([columns, list(self.primary_keys), foreign_keys], default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class SchemaSnapshot(object):
+    """
+    In-memory copy of remote schemas, read once through a reflection session.
+    Every crawl stage reads from the snapshot instead of going back to the remote database.
+    Tables are keyed by schema and name, see TableSnapshot.key.
+    """
+
+    def __init__(self, schema, tables):
+        self.schema = schema
+        self.tables = OrderedDict((table.key, table) for table in tables)
+
+    @classmethod
+    def capture(cls, reflection, workers=1, table_names=None, schema=None):
+        """
+        Reflect every table of a schema, the session's default one unless given, or only table_names
+        in the given order, the catalog queries then read those tables alone. With more than one worker
+        the tables the catalog did not cover are reflected concurrently over the session's engine and
+        merged back into order, so the result does not depend on which thread finished first.
+        """
+        stored_schema = reflection.stored_schema(schema)
+
+        def reflect_table(table_name):
+            return TableSnapshot(name=table_name,
+                                 columns=reflection.get_columns(table_name, schema=schema),
+                                 primary_keys=reflection.get_primary_keys(table_name, schema=schema),
+                                 foreign_keys=reflection.get_foreign_keys(table_name, schema=schema),
+                                 schema=stored_schema)
+
+        def reflect_tables(names):
+            if workers > 1 and len(names) > 1 and not reflection.bulk_loaded(schema):
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    return list(executor.map(reflect_table, names))
+            return [reflect_table(table_name) for table_name in names]
+
+        if table_names is not None:
+            reflection.load_tables(table_names, schema)
+            return cls(stored_schema, reflect_tables(list(table_names)))
+        if workers > 1 and not reflection.bulk_loaded(schema):
+            names = reflection.get_table_names(dependency_order=False, schema=schema)
+            reflected = dict(zip(names, reflect_tables(names)))
+            foreign_keys = {table.name: table.foreign_keys for table in reflected.values()}
+            return cls(stored_schema, [reflected[table_name] for table_name in sort_tables(names, foreign_keys)])
+        return cls(stored_schema, reflect_tables(reflection.get_table_names(schema=schema)))
+
+    @classmethod
+    def capture_schemas(cls, reflection, schemas, workers=1, schema_workers=1, on_captured=None):
+        """
+        Reflect several schemas side by side, schema_workers at a time, each with workers threads of its
+        own, so the crawl takes about as long as its largest schema. on_captured(schema, snapshot) is
+        called from the calling thread as each schema finishes. The merged snapshot keeps the given order.
+        """
+        if len(schemas) <= 1 or schema_workers <= 1:
+            snapshots = []
+            for schema in schemas:
+                snapshots.append(cls.capture(reflection, workers=workers, schema=schema))
+                if on_captured is not None:
+                    on_captured(schema, snapshots[-1])
+            return cls.merge(snapshots)
+        captured = {}
+        with ThreadPoolExecutor(max_workers=min(schema_workers, len(schemas))) as executor:
+            futures = dict((executor.submit(cls.capture, reflection, workers=workers, schema=schema), schema)
+                           for schema in schemas)
+            for future in as_completed(futures):
+                captured[futures[future]] = future.result()
+                if on_captured is not None:
+                    on_captured(futures[future], captured[futures[future]])
+        return cls.merge([captured[schema] for schema in schemas])
+
+    @classmethod
+    def merge(cls, snapshots):
+        """one snapshot holding the tables of every given snapshot, the schema of a single one is kept"""
+        schemas = set(snapshot.schema for snapshot in snapshots)
+        return cls(schemas.pop() if len(schemas) == 1 else None,
+                   [table for snapshot in snapshots for table in snapshot])
+
+    def __iter__(self):
+        return iter(self.tables.values())
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __getitem__(self, key):
+        """the table of a (schema, name) key, see TableSnapshot.key"""
+        return self.tables[key]
+
+    def __contains__(self, key):
+        """whether a (schema, name) key, see TableSnapshot.key, is in the snapshot"""
+        return key in self.tables
+
+    @property
+    def total(self):
+        """number of progress steps a crawl of this snapshot reports"""
+        total = len(self.tables)
+        for table in self:
+            total = total + len(table.columns) + len(table.primary_keys)
+            # composite keys flag and link every constrained column
+            total = total + sum(len(fk['constrained_columns']) for fk in table.foreign_keys) * 2
+        return total
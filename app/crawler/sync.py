@@ -0,0 +1,94 @@
+import time
+
+from sqlalchemy import bindparam, or_, select
+
+from app.crawler.index import MetadataIndex
+from app.crawler.snapshot import SchemaSnapshot, TableSnapshot
+from app.crawler.writer import MetadataWriter, chunks
+from app.models.column import Column
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+
+class MetadataSync(object):
+    """
+    Applies a fresh schema snapshot on top of an earlier crawl. Stored fingerprints are compared
+    with the snapshot and only new, changed and removed tables are written, together with the
+    foreign keys pointing at them. An unchanged schema costs a single select.
+    Nothing is committed here, the caller owns the transaction.
+    """
+
+    def __init__(self, session, database_id, chunk_size=1000):
+        self.session = session
+        self.database_id = database_id
+        self.chunk_size = chunk_size
+        self.writer = MetadataWriter(session, database_id, chunk_size=chunk_size)
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.seconds = 0.0
+
+    def apply(self, snapshot):
+        started = time.time()
+        query = select([Table.id, Table.table_name, Table.schema_name, Table.fingerprint]) \
+            .where(Table.database_id == self.database_id)
+        stored = {(row.schema_name, row.table_name): (row.id, row.fingerprint) for row in self.session.execute(query)}
+
+        new = [table for table in snapshot if table.key not in stored]
+        changed = [table for table in snapshot if table.key in stored and stored[table.key][1] != table.fingerprint]
+        removed = [stored[key][0] for key in stored if key not in snapshot]
+        self.inserted, self.updated, self.deleted = len(new), len(changed), len(removed)
+        self.unchanged = len(snapshot) - len(new) - len(changed)
+        if new or changed or removed:
+            self._delete(removed, [stored[table.key][0] for table in changed])
+            self._write(snapshot, stored, new, changed)
+        self.seconds += time.time() - started
+
+    def _delete(self, removed_ids, changed_ids):
+        # any foreign key from or to a rewritten table goes, its columns get new ids
+        for ids in chunks(removed_ids + changed_ids, self.chunk_size):
+            self.session.query(ForeignKey) \
+                .filter(or_(ForeignKey.table_id.in_(ids), ForeignKey.referred_table_id.in_(ids))) \
+                .delete(synchronize_session=False)
+            self.session.query(Column).filter(Column.table_id.in_(ids)).delete(synchronize_session=False)
+        for ids in chunks(removed_ids, self.chunk_size):
+            self.session.query(Table).filter(Table.id.in_(ids)).delete(synchronize_session=False)
+
+    def _write(self, snapshot, stored, new, changed):
+        for table in changed:
+            self.writer.index.add_table(table.name, stored[table.key][0], table.schema)
+        self.writer.write_tables(SchemaSnapshot(snapshot.schema, new))
+        if changed:
+            statement = Table.__table__.update().where(Table.id == bindparam('table_id')) \
+                .values(fingerprint=bindparam('fingerprint'))
+            self.session.execute(statement, [{'table_id': stored[table.key][0], 'fingerprint': table.fingerprint}
+                                             for table in changed])
+        self.writer.write_columns(SchemaSnapshot(snapshot.schema, changed + new))
+
+        # rewritten tables link all their foreign keys, untouched tables only those into rewritten tables
+        rewritten = set(table.key for table in changed + new)
+        relink = []
+        for table in snapshot:
+            if table.key in rewritten:
+                relink.append(table)
+                continue
+            foreign_keys = [fk for fk in table.foreign_keys
+                            if (fk.get('referred_schema'), fk['referred_table']) in rewritten]
+            if foreign_keys:
+                relink.append(TableSnapshot(table.name, table.columns, table.primary_keys, foreign_keys,
+                                            schema=table.schema))
+        if relink:
+            self.writer.index = MetadataIndex.load(self.session, self.database_id)
+            self.writer.write_foreign_keys(SchemaSnapshot(snapshot.schema, relink))
+
+    @property
+    def stats(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'deleted': self.deleted,
+            'unchanged': self.unchanged,
+            'seconds': round(self.seconds, 3),
+            'persistence': self.writer.stats
+        }
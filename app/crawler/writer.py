@@ -0,0 +1,135 @@
+import logging
+import time
+
+from sqlalchemy import select
+
+from app.crawler.index import MetadataIndex
+from app.models.column import Column
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+logger = logging.getLogger(__name__)
+
+
+def column_values(column, table_id, is_pk=False, is_fk=False):
+    """row for the columns table built from an Inspector style column dict"""
+    return {
+        'column_name': str(column.get('name', 'default_column_name')),
+        'column_type': str(getattr(column.get('type'), '__visit_name__')),
+        'column_default': column.get('default', None),
+        'is_nullable': bool(column.get('nullable', True)),
+        'is_autoincrement': bool(column.get('autoincrement', False)),
+        'is_pk': is_pk,
+        'is_fk': is_fk,
+        'table_id': table_id
+    }
+
+
+def chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class MetadataWriter(object):
+    """
+    Persists a schema snapshot with multi-row Core inserts, chunk_size rows per statement.
+    Nothing is committed here, the caller owns the transaction so a crawl is stored all or nothing.
+    """
+
+    def __init__(self, session, database_id, chunk_size=1000, on_progress=None, on_stage=None):
+        self.session = session
+        self.database_id = database_id
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.on_stage = on_stage
+        self.index = MetadataIndex()
+        self.rows = 0
+        self.statements = 0
+        self.seconds = 0.0
+
+    def write(self, snapshot, foreign_keys=True):
+        """
+        Store tables and columns of the snapshot. Linking foreign keys can be left to a later
+        write_foreign_keys call once every referred table is stored, e.g. by another crawl chunk.
+        """
+        self.write_tables(snapshot)
+        self.write_columns(snapshot)
+        if foreign_keys:
+            self.write_foreign_keys(snapshot)
+
+    def _stage(self, name):
+        if self.on_stage is not None:
+            self.on_stage(name)
+
+    def _insert(self, table, rows, steps=None):
+        for chunk in chunks(rows, self.chunk_size):
+            self.session.execute(table.insert().values(chunk))
+            self.statements += 1
+            self.rows += len(chunk)
+            if self.on_progress is not None:
+                self.on_progress(len(chunk) if steps is None else steps(chunk))
+
+    def write_tables(self, snapshot):
+        started = time.time()
+        self._stage('tables')
+        rows = [{'table_name': table.name, 'schema_name': table.schema, 'database_id': self.database_id,
+                 'fingerprint': table.fingerprint} for table in snapshot]
+        self._insert(Table.__table__, rows)
+        # fetch back only the ids of the tables just written, the database may hold other crawl chunks
+        for names in chunks(sorted(set(table.name for table in snapshot)), self.chunk_size):
+            query = select([Table.id, Table.table_name, Table.schema_name]) \
+                .where(Table.database_id == self.database_id).where(Table.table_name.in_(names))
+            self.statements += 1
+            for row in self.session.execute(query):
+                self.index.add_table(row.table_name, row.id, row.schema_name)
+        self.seconds += time.time() - started
+
+    def write_columns(self, snapshot):
+        started = time.time()
+        # primary keys are flagged on the column rows, they are stored in this stage too
+        self._stage('columns')
+        rows = []
+        for table in snapshot:
+            fk_names = set(name for fk in table.foreign_keys for name in fk['constrained_columns'])
+            for column in table.columns:
+                name = str(column.get('name', 'default_column_name'))
+                rows.append(column_values(column, self.index.table_id(table.name, table.schema),
+                                          is_pk=name in table.primary_keys, is_fk=name in fk_names))
+        # a column row stands for its own progress step plus the pk and fk flags it carries
+        self._insert(Column.__table__, rows, steps=lambda chunk: sum(1 + row['is_pk'] + row['is_fk']
+                                                                     for row in chunk))
+        table_ids = [self.index.table_id(table.name, table.schema) for table in snapshot]
+        for ids in chunks(table_ids, self.chunk_size):
+            query = select([Column.id, Column.table_id, Column.column_name]).where(Column.table_id.in_(ids))
+            self.statements += 1
+            for row in self.session.execute(query):
+                self.index.add_column(row.table_id, row.column_name, row.id)
+        self.seconds += time.time() - started
+
+    def write_foreign_keys(self, snapshot):
+        started = time.time()
+        self._stage('fks')
+        rows = []
+        for table in snapshot:
+            for column in table.columns:
+                name = str(column.get('name', 'default_column_name'))
+                for fk in table.foreign_keys:
+                    if name not in fk['constrained_columns']:
+                        continue
+                    fk_rows = self.index.resolve(table.name, name, fk, table.schema)
+                    if fk_rows is None:
+                        logger.warning('skipping foreign key %s.%s, %s was not crawled', table.name, name,
+                                       fk['referred_table'])
+                        continue
+                    rows.extend(fk_rows)
+        self._insert(ForeignKey.__table__, rows)
+        self.seconds += time.time() - started
+
+    @property
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'statements': self.statements,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds, 1) if self.seconds else None
+        }
@@ -0,0 +1,125 @@
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, Counter
+
+from sqlalchemy import create_engine
+
+logger = logging.getLogger(__name__)
+
+
+def engine_key(url, options):
+    """hash of the connection url and engine options, the url carries credentials and is never kept as a key"""
+    payload = json.dumps([str(url), options], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class EngineRegistry(object):
+    """
+    Process-wide remote engines keyed by connection url and options, so pings, API reads and every
+    crawl of a database reuse one warm pool. The pool size is not part of the key, a lookup asking for a
+    larger pool than the registered one replaces it once with the larger pool. At most ENGINE_REGISTRY_SIZE
+    pools stay open, the least recently used idle one is disposed first, and pools nobody used for
+    ENGINE_IDLE_TTL seconds are disposed on the next lookup. Pools with connections checked out are never
+    evicted, and connections checked out of a replaced pool keep working and are closed on return.
+    """
+
+    def __init__(self, app=None):
+        self.max_engines = 32
+        self.idle_ttl = 600
+        self.engines = OrderedDict()
+        self.last_used = {}
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_engines = app.config['ENGINE_REGISTRY_SIZE']
+        self.idle_ttl = app.config['ENGINE_IDLE_TTL']
+        atexit.register(self.dispose_all)
+
+    def get(self, url, pool_size=5, **options):
+        key = engine_key(url, options)
+        now = time.time()
+        evicted = []
+        with self.lock:
+            engine = self.engines.get(key)
+            if engine is not None and self._pool_size(engine) < pool_size:
+                evicted.append(self._pop(key))
+                self.counters['resized'] += 1
+                engine = None
+            if engine is not None:
+                self.engines.move_to_end(key)
+                self.counters['hits'] += 1
+            else:
+                engine = create_engine(url, pool_size=pool_size, **options)
+                self.engines[key] = engine
+                self.counters['misses'] += 1
+            self.last_used[key] = now
+            for other, last_used in list(self.last_used.items()):
+                if other != key and now - last_used > self.idle_ttl and not self._in_use(self.engines[other]):
+                    evicted.append(self._pop(other))
+            idle = [other for other, engine_ in self.engines.items() if other != key and not self._in_use(engine_)]
+            while len(self.engines) > self.max_engines and idle:
+                evicted.append(self._pop(idle.pop(0)))
+        for engine_ in evicted:
+            self._dispose(engine_)
+        return engine
+
+    @staticmethod
+    def _pool_size(engine):
+        size = getattr(engine.pool, 'size', None)
+        return size() if callable(size) else size or 0
+
+    @staticmethod
+    def _in_use(engine):
+        checkedout = getattr(engine.pool, 'checkedout', None)
+        return bool(checkedout()) if checkedout is not None else False
+
+    def _pop(self, key):
+        self.last_used.pop(key, None)
+        self.counters['evictions'] += 1
+        return self.engines.pop(key)
+
+    @staticmethod
+    def _dispose(engine):
+        try:
+            engine.dispose()
+        except Exception as e:
+            logger.warning('engine of %s not disposed: %s', engine.url.host, e)
+
+    def dispose_all(self):
+        """dispose every pool, on worker and process shutdown"""
+        with self.lock:
+            engines = list(self.engines.values())
+            self.engines.clear()
+            self.last_used.clear()
+        for engine in engines:
+            self._dispose(engine)
+
+    @property
+    def stats(self):
+        """counters of this process since it started"""
+        now = time.time()
+        with self.lock:
+            pools = [{
+                'key': key[:12],
+                'dialect': engine.dialect.name,
+                'host': engine.url.host,
+                'checked_out': engine.pool.checkedout() if hasattr(engine.pool, 'checkedout') else None,
+                'idle_seconds': round(now - self.last_used[key], 1)
+            } for key, engine in self.engines.items()]
+        return {
+            'hits': self.counters['hits'],
+            'misses': self.counters['misses'],
+            'evictions': self.counters['evictions'],
+            'resized': self.counters['resized'],
+            'engines': len(pools),
+            'max_engines': self.max_engines,
+            'idle_ttl': self.idle_ttl,
+            'pools': pools
+        }
@@ -3,6 +3,14 @@ from app import db
 
 class Column(db.Model):
     __tablename__ = "columns"
+    # flag indexes are partial where the backend supports it, so they only hold the flagged columns
+    __table_args__ = (
+        db.Index('ix_columns_table_id_column_name', 'table_id', 'column_name'),
+        # name search across databases
+        db.Index('ix_columns_column_name', 'column_name'),
+        db.Index('ix_columns_table_id_is_pk', 'table_id', 'is_pk', postgresql_where=db.text('is_pk')),
+        db.Index('ix_columns_table_id_is_fk', 'table_id', 'is_fk', postgresql_where=db.text('is_fk')),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     column_name = db.Column(db.String(80), nullable=False)
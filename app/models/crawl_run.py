@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+
+from app import db
+
+CrawlRunKinds = ('crawl', 'recrawl', 'distributed')
+CrawlRunStatusTypes = ('completed', 'skipped', 'failed')
+
+
+class CrawlRun(db.Model):
+    """one crawl of a database and where its time went, see app.crawler.instrumentation for the report"""
+    __tablename__ = "crawl_runs"
+    __table_args__ = (
+        db.Index('ix_crawl_runs_database_id_id', 'database_id', 'id'),
+    )
+
+    id = db.Column(db.Integer(), primary_key=True)
+    database_id = db.Column(db.Integer, db.ForeignKey('databases.id', ondelete="cascade"), nullable=False)
+    task_id = db.Column(db.String(155), nullable=True)
+    kind = db.Column(db.Enum(*CrawlRunKinds, name='crawl_run_kinds'), nullable=False)
+    status = db.Column(db.Enum(*CrawlRunStatusTypes, name='crawl_run_status_types'), nullable=False)
+    started_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+    seconds = db.Column(db.Float(), nullable=False)
+    round_trips = db.Column(db.Integer(), nullable=False, default=0)
+    statements = db.Column(db.Integer(), nullable=False, default=0)
+    rows = db.Column(db.Integer(), nullable=False, default=0)
+    # the full instrumentation report as json
+    report = db.Column(db.Text(), nullable=False)
+    error = db.Column(db.Text(), nullable=True)
+
+    @classmethod
+    def from_report(cls, database_id, kind, status, report, started=None, task_id=None, error=None):
+        return cls(database_id=database_id, kind=kind, status=status, task_id=task_id, error=error,
+                   started_at=datetime.utcfromtimestamp(started) if started else datetime.utcnow(),
+                   seconds=report['seconds'], round_trips=report.get('round_trips', 0),
+                   statements=report['statements'], rows=sum(report.get('rows', {}).values()),
+                   report=json.dumps(report))
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'database_id': self.database_id,
+            'task_id': self.task_id,
+            'kind': self.kind,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'seconds': self.seconds,
+            'round_trips': self.round_trips,
+            'statements': self.statements,
+            'rows': self.rows,
+            'report': json.loads(self.report),
+            'error': self.error
+        }
+
+    def __repr__(self):
+        return '<CrawlRun %r>' % self.id
@@ -1,8 +1,19 @@
+import json
+import re
+import uuid
+from datetime import datetime
+
 from sqlalchemy.engine.reflection import Inspector
-from sqlalchemy import create_engine, MetaData, select, exc
+from sqlalchemy import MetaData, and_, select, exc, create_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import validates
 
-from app import db
+from app import db, engine_registry
+from app.crawler.filters import TableFilter, compile_pattern
+from app.crawler.reflection import ReflectionSession
+from app.models.column import Column
+from app.models.table import Table
+from app.models.serializer import tables_json
 
 DATABASE_TYPES = {
     'mysql': 'mysql',
@@ -10,6 +21,19 @@ DATABASE_TYPES = {
     'postgresql': 'postgresql+psycopg2'
 }
 
+# connect timeouts per dbtype, shared by every engine of a connection so pings and crawls use one pool
+CONNECT_ARGS = {
+    'mysql': {'connect_timeout': 10},
+    'mssql': {'login_timeout': 10},
+    'postgresql': {'connect_timeout': 10}
+}
+
+# dbtypes whose databases hold several schemas, a crawl covers all of them unless allow-listed
+MULTI_SCHEMA_TYPES = ('postgresql', 'mssql')
+
+# dbtypes listing partitions as tables of their own, collapsed into their parent table unless disabled
+PARTITIONED_TYPES = ('postgresql',)
+
 DatabaseStatusTypes = ('pending', 'processed', 'failed')
 
 
@@ -24,16 +48,48 @@ class Database(db.Model):
     dbname = db.Column(db.String(80), nullable=False)
     status = db.Column(db.Enum(*DatabaseStatusTypes), default=DatabaseStatusTypes[0], nullable=False,
                        server_default=DatabaseStatusTypes[0])
+    # reflection threads used when crawling, falls back to the per dbtype CRAWL_CONCURRENCY setting
+    crawl_concurrency = db.Column(db.Integer(), nullable=True)
+    # json list of the schemas to crawl, all of them when unset
+    crawl_schemas = db.Column(db.Text(), nullable=True)
+    # json lists of glob or 're:' regex table patterns, see app.crawler.filters.TableFilter
+    crawl_include = db.Column(db.Text(), nullable=True)
+    crawl_exclude = db.Column(db.Text(), nullable=True)
+    # most tables crawled per schema
+    crawl_max_tables = db.Column(db.Integer(), nullable=True)
+    collapse_partitions = db.Column(db.Boolean(), nullable=False, default=True, server_default=db.true())
+    # digest of the remote catalog at the last crawl, a refresh is skipped while it stays the same
+    schema_signal = db.Column(db.String(40), nullable=True)
+    signal_checked_at = db.Column(db.DateTime(), nullable=True)
+    crawls_skipped = db.Column(db.Integer(), nullable=False, default=0, server_default='0')
+    # bookkeeping of the refresh scheduler
+    last_crawled_at = db.Column(db.DateTime(), nullable=True)
+    last_crawl_seconds = db.Column(db.Float(), nullable=True)
+    refresh_enqueued_at = db.Column(db.DateTime(), nullable=True)
+    # the last crawl or refresh attempt and the failures in a row, failing databases are retried with a backoff
+    last_attempted_at = db.Column(db.DateTime(), nullable=True)
+    crawl_failures = db.Column(db.Integer(), nullable=False, default=0, server_default='0')
+    # bumped whenever a crawl changes the stored metadata, part of the metadata cache key and ETag
+    crawl_generation = db.Column(db.Integer(), nullable=False, default=0, server_default='0')
+    # random per row, keeps cache keys apart when a deleted database's id is handed out again
+    cache_token = db.Column(db.String(32), nullable=False, default=lambda: uuid.uuid4().hex)
 
     tables = db.relationship('Table', backref=db.backref('databases', lazy='joined', cascade="all,delete"),
                              lazy='dynamic')
 
-    def __init__(self, dbtype, username, password, hostname, dbname):
+    def __init__(self, dbtype, username, password, hostname, dbname, crawl_concurrency=None, crawl_schemas=None,
+                 crawl_include=None, crawl_exclude=None, crawl_max_tables=None, collapse_partitions=True):
         self.dbtype = dbtype
         self.username = username
         self.password = password
         self.hostname = hostname
         self.dbname = dbname
+        self.crawl_concurrency = crawl_concurrency
+        self.crawl_schemas = json.dumps(crawl_schemas) if crawl_schemas else None
+        self.crawl_include = json.dumps(crawl_include) if crawl_include else None
+        self.crawl_exclude = json.dumps(crawl_exclude) if crawl_exclude else None
+        self.crawl_max_tables = crawl_max_tables
+        self.collapse_partitions = collapse_partitions
         super(Database, self).__init__()
 
     def __str__(self):
@@ -74,15 +130,33 @@ class Database(db.Model):
             raise AssertionError('No database name provided')
         return dbname
 
+    @validates('crawl_include', 'crawl_exclude')
+    def validate_crawl_patterns(self, key, patterns):
+        for pattern in json.loads(patterns) if patterns else []:
+            try:
+                compile_pattern(pattern)
+            except re.error as err:
+                raise AssertionError('Invalid table pattern %r: %s' % (pattern, err))
+        return patterns
+
     @property
     def get_sqlalchemy_uri(self):
         return self.get_sqlalchemy_driver + "://" + self.username + ":" + self.password + "@" + self.hostname + "/" \
                + self.dbname
 
-    def get_sqla_engine(self, **kwargs):
-        url = self.get_sqlalchemy_uri
-        return create_engine(url, pool_recycle=3600, pool_pre_ping=True, pool_timeout=30,
-                             connect_args=kwargs)
+    def get_sqla_engine(self, pool_size=5, **kwargs):
+        """the process-wide engine of this connection, see app.engines.EngineRegistry; never dispose it"""
+        connect_args = dict(CONNECT_ARGS.get(self.dbtype, {}), **kwargs)
+        return engine_registry.get(self.get_sqlalchemy_uri, pool_recycle=3600, pool_pre_ping=True, pool_timeout=30,
+                                   pool_size=pool_size, connect_args=connect_args)
+
+    def get_candidate_engine(self):
+        """
+        an engine without a pool outside the registry, for a connection that is not registered yet
+        so pinging candidates never evicts the pools of registered connections. dispose it after use
+        """
+        return create_engine(self.get_sqlalchemy_uri, poolclass=NullPool,
+                             connect_args=CONNECT_ARGS.get(self.dbtype, {}))
 
     def get_remote_inspector(self):
         return Inspector.from_engine(self.get_sqla_engine())
@@ -90,25 +164,76 @@ class Database(db.Model):
     def get_remote_metadata(self):
         return MetaData(self.get_sqla_engine(), reflect=True)
 
-    def get_remote_tables(self):
-        insp = self.get_remote_inspector()
-        tables = []
-        for tt in insp.get_sorted_table_and_fkc_names(schema=insp.default_schema_name):
-            if tt[0] is not None:
-                tables.append(tt[0])
-        return tables
-
-    def get_remote_columns(self, table_name):
-        insp = self.get_remote_inspector()
-        return insp.get_columns(table_name=table_name, schema=insp.default_schema_name)
-
-    def get_remote_primary_keys(self, table_name):
-        insp = self.get_remote_inspector()
-        return insp.get_primary_keys(table_name=table_name, schema=insp.default_schema_name)
-
-    def get_remote_foreign_keys(self, table_name):
-        insp = self.get_remote_inspector()
-        return insp.get_foreign_keys(table_name=table_name, schema=insp.default_schema_name)
+    def reflection_session(self, workers=1, schema_workers=1, filtered=True):
+        """a reflection session over the pooled engine, filtered lists only the tables the crawl filters keep"""
+        return ReflectionSession(self.get_sqla_engine(pool_size=max(5, workers * schema_workers)),
+                                 table_filter=self.get_table_filter() if filtered else None)
+
+    def get_table_filter(self):
+        """the crawl filters of this connection, None when every listed table is crawled"""
+        collapse_partitions = self.collapse_partitions is not False and self.dbtype in PARTITIONED_TYPES
+        if not (self.crawl_include or self.crawl_exclude or self.crawl_max_tables or collapse_partitions):
+            return None
+        return TableFilter(include=json.loads(self.crawl_include) if self.crawl_include else None,
+                           exclude=json.loads(self.crawl_exclude) if self.crawl_exclude else None,
+                           max_tables=self.crawl_max_tables, collapse_partitions=collapse_partitions)
+
+    def get_crawl_concurrency(self, defaults):
+        if self.crawl_concurrency:
+            return self.crawl_concurrency
+        return defaults.get(self.dbtype, 1)
+
+    def _reflect(self, reflection, method, *args, **kwargs):
+        if reflection is not None:
+            return getattr(reflection, method)(*args, **kwargs)
+        with self.reflection_session() as reflection:
+            return getattr(reflection, method)(*args, **kwargs)
+
+    def get_remote_schemas(self, reflection=None):
+        """
+        schemas a crawl covers: the allow-list, else every user schema when the dbtype has several,
+        else the default schema alone, written None
+        """
+        if self.crawl_schemas:
+            return json.loads(self.crawl_schemas)
+        if self.dbtype not in MULTI_SCHEMA_TYPES:
+            return [None]
+        return self._reflect(reflection, 'get_schema_names')
+
+    def get_remote_tables(self, reflection=None, schema=None):
+        return self._reflect(reflection, 'get_table_names', schema=schema)
+
+    def get_remote_columns(self, table_name, reflection=None, schema=None):
+        return self._reflect(reflection, 'get_columns', table_name, schema=schema)
+
+    def get_remote_primary_keys(self, table_name, reflection=None, schema=None):
+        return self._reflect(reflection, 'get_primary_keys', table_name, schema=schema)
+
+    def get_remote_foreign_keys(self, table_name, reflection=None, schema=None):
+        return self._reflect(reflection, 'get_foreign_keys', table_name, schema=schema)
+
+    def get_remote_schema_signal(self, reflection=None, schemas=None):
+        return self._reflect(reflection, 'get_schema_signal', schemas=schemas)
+
+    def is_unchanged(self, signal):
+        return signal is not None and self.status == 'processed' and signal == self.schema_signal
+
+    def record_crawl(self, seconds=None):
+        """note a finished crawl or skipped refresh, seconds is the cost of an actual crawl"""
+        self.last_crawled_at = self.last_attempted_at = datetime.utcnow()
+        if seconds is not None:
+            self.last_crawl_seconds = seconds
+        self.refresh_enqueued_at = None
+        self.crawl_failures = 0
+
+    def record_failure(self):
+        """note a failed crawl or refresh, the scheduler backs off while failures keep coming"""
+        self.last_attempted_at = datetime.utcnow()
+        self.crawl_failures = (self.crawl_failures or 0) + 1
+        self.refresh_enqueued_at = None
+
+    def bump_generation(self):
+        self.crawl_generation = (self.crawl_generation or 0) + 1
 
     @property
     def to_json(self):
@@ -119,82 +244,105 @@ class Database(db.Model):
             'password': self.password,
             'host': self.hostname,
             'dbname': self.dbname,
-            'tables': [table.to_json for table in self.tables],
+            'tables': tables_json(db.session, self.id),
             'status': self.status
         }
         return json_database
 
+    @property
+    def metadata_json(self):
+        """to_json without the credentials, what the metadata cache stores, see credentials_json"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'host': self.hostname,
+            'dbname': self.dbname,
+            'tables': tables_json(db.session, self.id),
+            'status': self.status
+        }
+
+    @property
+    def credentials_json(self):
+        """the fields of to_json left out of metadata_json"""
+        return {
+            'sqla_url': self.get_sqlalchemy_uri,
+            'password': self.password
+        }
+
     @property
     def get_sqlalchemy_driver(self):
         if self.dbtype in DATABASE_TYPES:
             return DATABASE_TYPES[self.dbtype]
 
     def get_number_of_tables(self):
-        return len(self.tables)
+        return self.tables.count()
 
     def get_tables(self):
         return self.tables
 
     def get_column_with_this_name(self, name):
-        for table in self.tables:
-            for column in table.get_columns():
-                if column.column_name == name:
-                    return column
+        return Column.query.join(Table, Column.table_id == Table.id) \
+            .filter(Table.database_id == self.id, Column.column_name == name) \
+            .order_by(Table.id, Column.id).first()
 
-    def get_table_by_name(self, table_name):
-        for table in self.tables:
-            if table.table_name == table_name:
-                return table
+    def get_table_by_name(self, table_name, schema_name=None):
+        """the stored table, schema_name None for the connection's default schema"""
+        return self.tables.filter(Table.table_name == table_name, Table.schema_name == schema_name) \
+            .order_by(Table.id).first()
 
     def get_tables_into_dictionary(self):
+        """{(schema name, table name): [column names]}, same-named tables of two schemas stay apart"""
         data = {}
-        for table in self.tables:
-            data[table.name] = []
-            for column in table.get_columns():
-                data[table.table_name].append(column.column_name)
+        rows = db.session.query(Table.schema_name, Table.table_name, Column.column_name) \
+            .outerjoin(Column, Column.table_id == Table.id) \
+            .filter(Table.database_id == self.id).order_by(Table.id, Column.id)
+        for schema_name, table_name, column_name in rows:
+            data.setdefault((schema_name, table_name), [])
+            if column_name is not None:
+                data[(schema_name, table_name)].append(column_name)
         return data
 
-    def get_primary_keys_by_table(self):
+    def _flagged_columns_by_table(self, flag, table_name=None, schema_name=None):
+        """
+        {(schema name, table name): [flagged columns]} in one query, tables without flagged columns map
+        to an empty list. Given a table_name only that table of schema_name is read.
+        """
+        query = db.session.query(Table.schema_name, Table.table_name, Column) \
+            .outerjoin(Column, and_(Column.table_id == Table.id, flag)) \
+            .filter(Table.database_id == self.id)
+        if table_name is not None:
+            query = query.filter(Table.table_name == table_name, Table.schema_name == schema_name)
         data = {}
-        for table in self.tables:
-            data[table.table_name] = table.get_primary_keys()
+        for schema, name, column in query.order_by(Table.id, Column.id):
+            data.setdefault((schema, name), [])
+            if column is not None:
+                data[(schema, name)].append(column)
         return data
 
+    def get_primary_keys_by_table(self):
+        return self._flagged_columns_by_table(Column.is_pk)
+
     def get_foreign_keys_by_table(self):
-        data = {}
-        for table in self.tables:
-            data[table.table_name] = table.get_foreign_keys()
-        return data
+        return self._flagged_columns_by_table(Column.is_fk)
+
+    def get_primary_keys_of_table(self, table_name, schema_name=None):
+        return self._flagged_columns_by_table(Column.is_pk, table_name, schema_name).get((schema_name, table_name))
+
+    def get_primary_key_names_of_table(self, table_name, schema_name=None):
+        primary_keys = self.get_primary_keys_of_table(table_name, schema_name)
+        if primary_keys is not None:
+            return [column.column_name for column in primary_keys]
+
+    def get_foreign_keys_of_table(self, table_name, schema_name=None):
+        return self._flagged_columns_by_table(Column.is_fk, table_name, schema_name).get((schema_name, table_name))
+
+    def get_foreign_key_names_of_table(self, table_name, schema_name=None):
+        foreign_keys = self.get_foreign_keys_of_table(table_name, schema_name)
+        if foreign_keys is not None:
+            return [column.column_name for column in foreign_keys]
 
-    def get_primary_keys_of_table(self, table_name):
-        for table in self.tables:
-            if table.table_name == table_name:
-                return table.get_primary_keys()
-
-    def get_primary_key_names_of_table(self, table_name):
-        for table in self.tables:
-            if table.table_name == table_name:
-                return table.get_primary_key_names()
-
-    def get_foreign_keys_of_table(self, table_name):
-        for table in self.tables:
-            if table.table_name == table_name:
-                return table.get_foreign_keys()
-
-    def get_foreign_key_names_of_table(self, table_name):
-        for table in self.tables:
-            if table.table_name == table_name:
-                return table.get_foreign_key_names()
-
-    def ping_connection(self):
-        if self.dbtype == 'mysql':
-            engine = self.get_sqla_engine(connect_timeout=10)
-        elif self.dbtype == 'mssql':
-            engine = self.get_sqla_engine(login_timeout=10, timeout=10)
-        elif self.dbtype == 'postgresql':
-            engine = self.get_sqla_engine(connect_timeout=10)
-        else:
-            engine = self.get_sqla_engine()
+    def ping_connection(self, engine=None):
+        engine = engine if engine is not None else self.get_sqla_engine()
         connection = engine.connect()
         save_should_close_with_result = connection.should_close_with_result
         connection.should_close_with_result = False
@@ -210,4 +358,3 @@ class Database(db.Model):
             # restore "close with result"
             connection.should_close_with_result = save_should_close_with_result
             connection.close()
-            engine.dispose()
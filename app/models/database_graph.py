@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from app import db
+
+
+class DatabaseGraph(db.Model):
+    """foreign key graph of a crawled database, see app.crawler.graph.SchemaGraph for the payload"""
+    __tablename__ = "database_graphs"
+
+    database_id = db.Column(db.Integer, db.ForeignKey('databases.id', ondelete="cascade"), primary_key=True)
+    # crawl generation of the database the graph was built from, an older graph is rebuilt on use
+    crawl_generation = db.Column(db.Integer(), nullable=False)
+    tables = db.Column(db.Integer(), nullable=False)
+    edges = db.Column(db.Integer(), nullable=False)
+    payload = db.Column(db.LargeBinary(length=2 ** 32 - 1), nullable=False)
+    built_at = db.Column(db.DateTime(), nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<DatabaseGraph %r>' % self.database_id
@@ -3,6 +3,10 @@ from app import db
 
 class ForeignKey(db.Model):
     __tablename__ = "foreign_keys"
+    __table_args__ = (
+        db.Index('ix_foreign_keys_table_id', 'table_id'),
+        db.Index('ix_foreign_keys_referred_table_id', 'referred_table_id'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
 
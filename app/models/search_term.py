@@ -0,0 +1,12 @@
+from app import db
+
+
+class SearchTerm(db.Model):
+    """a distinct table or column name seen in any crawl, the vocabulary of the name search"""
+    __tablename__ = "search_terms"
+
+    id = db.Column(db.Integer(), primary_key=True)
+    term = db.Column(db.String(80), nullable=False, unique=True, index=True)
+
+    def __repr__(self):
+        return '<SearchTerm %r>' % self.term
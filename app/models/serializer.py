@@ -0,0 +1,143 @@
+import json
+from collections import defaultdict
+
+from sqlalchemy import or_, select
+
+from app.models.column import Column
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+tables = Table.__table__
+columns = Column.__table__
+foreign_keys = ForeignKey.__table__
+referred_tables = tables.alias('referred_tables')
+referred_columns = columns.alias('referred_columns')
+
+
+def column_json(row):
+    """same dict as Column.to_json, built from a columns row"""
+    return {
+        'id': row.id,
+        'column_name': row.column_name,
+        'column_type': row.column_type,
+        'column_default': row.column_default,
+        'is_nullable': row.is_nullable,
+        'is_autoincrement': row.is_autoincrement,
+        'is_pk': row.is_pk,
+        'is_fk': row.is_fk,
+        'table_id': row.table_id
+    }
+
+
+def assemble(session, table_rows, table_ids):
+    """
+    Table.to_json of the given tables rows, their columns and the relations from and to them
+    are read with one select each. table_ids is a list or a select of the same tables' ids.
+    """
+    column_rows = session.execute(select([columns]).where(columns.c.table_id.in_(table_ids))
+                                  .order_by(columns.c.id))
+    fk_rows = session.execute(
+        select([foreign_keys, tables.c.table_name, columns.c.column_name,
+                referred_tables.c.table_name.label('referred_table'),
+                referred_columns.c.column_name.label('referred_column')])
+        .select_from(foreign_keys.join(tables, foreign_keys.c.table_id == tables.c.id)
+                     .join(columns, foreign_keys.c.column_id == columns.c.id)
+                     .join(referred_tables, foreign_keys.c.referred_table_id == referred_tables.c.id)
+                     .join(referred_columns, foreign_keys.c.referred_column_id == referred_columns.c.id))
+        .where(or_(foreign_keys.c.table_id.in_(table_ids), foreign_keys.c.referred_table_id.in_(table_ids)))
+        .order_by(foreign_keys.c.id))
+
+    columns_by_table = defaultdict(list)
+    for row in column_rows:
+        columns_by_table[row.table_id].append(column_json(row))
+    relations = defaultdict(list)
+    reverse_relations = defaultdict(list)
+    for fk in fk_rows:
+        relations[fk.table_id].append({
+            'self_column_name': fk.column_name,
+            'referred_column_id': fk.referred_column_id,
+            'referred_column': fk.referred_column,
+            'referred_table_id': fk.referred_table_id,
+            'referred_table': fk.referred_table
+        })
+        reverse_relations[fk.referred_table_id].append({
+            'self_column_name': fk.referred_column,
+            'reverse_column_name': fk.column_name,
+            'reverse_column_id': fk.column_id,
+            'reverse_table_name': fk.table_name,
+            'reverse_table_id': fk.table_id,
+        })
+
+    return [{
+        'id': row.id,
+        'table_name': row.table_name,
+        'schema_name': row.schema_name,
+        'database_id': row.database_id,
+        'columns': columns_by_table[row.id],
+        'relations': relations[row.id],
+        'reverse_relations': reverse_relations[row.id],
+    } for row in table_rows]
+
+
+def tables_json(session, database_id):
+    """
+    Table.to_json of every table of a database, read with three set based selects instead of
+    a handful of lazy loads per table, column and relation.
+    """
+    table_rows = session.execute(select([tables.c.id, tables.c.table_name, tables.c.schema_name,
+                                         tables.c.database_id])
+                                 .where(tables.c.database_id == database_id).order_by(tables.c.id)).fetchall()
+    table_ids = select([tables.c.id]).where(tables.c.database_id == database_id)
+    return assemble(session, table_rows, table_ids)
+
+
+def iter_tables_json(session, database_id, batch_size=500):
+    """
+    Table.to_json of every table of a database, batch_size tables at a time walking the table ids,
+    so memory depends on the batch and not on the size of the schema.
+    """
+    after = 0
+    while True:
+        table_rows = session.execute(select([tables.c.id, tables.c.table_name, tables.c.schema_name,
+                                             tables.c.database_id])
+                                     .where(tables.c.database_id == database_id).where(tables.c.id > after)
+                                     .order_by(tables.c.id).limit(batch_size)).fetchall()
+        if not table_rows:
+            return
+        for table in assemble(session, table_rows, [row.id for row in table_rows]):
+            yield table
+        after = table_rows[-1].id
+
+
+def database_header(database):
+    """the exported description of a database, without its credentials"""
+    return {
+        'id': database.id,
+        'dbtype': database.dbtype,
+        'host': database.hostname,
+        'dbname': database.dbname,
+        'status': database.status
+    }
+
+
+def export_ndjson(session, database, batch_size=500):
+    """a line with the database followed by one line per table"""
+    yield json.dumps({'database': database_header(database)}, sort_keys=True) + '\n'
+    for table in iter_tables_json(session, database.id, batch_size):
+        yield json.dumps(table, sort_keys=True) + '\n'
+
+
+def export_json(session, database, batch_size=500):
+    """a single {"database": ..., "tables": [...]} document, written one table at a time"""
+    yield '{"database": %s, "tables": [' % json.dumps(database_header(database), sort_keys=True)
+    separator = '\n'
+    for table in iter_tables_json(session, database.id, batch_size):
+        yield separator + json.dumps(table, sort_keys=True)
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'json': (export_json, 'application/json')
+}
@@ -1,11 +1,22 @@
 from app import db
+from app.models.column import Column
 
 
 class Table(db.Model):
     __tablename__ = "tables"
+    __table_args__ = (
+        db.Index('ix_tables_database_id_table_name', 'database_id', 'table_name'),
+        # name search across databases
+        db.Index('ix_tables_table_name', 'table_name'),
+        db.Index('ix_tables_database_id_schema_name', 'database_id', 'schema_name'),
+    )
 
     id = db.Column(db.Integer(), primary_key=True)
     table_name = db.Column(db.String(80), nullable=False)
+    # remote schema of the table, None for the connection's default schema
+    schema_name = db.Column(db.String(80), nullable=True)
+    # sha1 of the reflected definition, lets a re-crawl skip tables that did not change
+    fingerprint = db.Column(db.String(40), nullable=True)
     database_id = db.Column(db.Integer, db.ForeignKey('databases.id', ondelete="cascade"))
     database = db.relationship('Database')
 
@@ -34,6 +45,7 @@ class Table(db.Model):
         json_table = {
             'id': self.id,
             'table_name': self.table_name,
+            'schema_name': self.schema_name,
             'database_id': self.database_id,
             'columns': [column.to_json for column in self.columns],
             # 'primary_keys': self.get_primary_key_names(),
@@ -54,43 +66,27 @@ class Table(db.Model):
         return self.get_remote_db_metadata().tables[self.table_name].columns
 
     def get_number_of_columns(self):
-        return len(self.columns)
+        return self.columns.count()
 
     def get_columns(self):
         return self.columns
 
     def get_column_by_name(self, column_name):
-        for column in self.columns:
-            if column.column_name == column_name:
-                return column
+        return self.columns.filter(Column.column_name == column_name).order_by(Column.id).first()
 
     def get_primary_keys(self):
-        primary_keys = []
-        for column in self.columns:
-            if column.is_primary():
-                primary_keys.append(column)
-        return primary_keys
+        return self.columns.filter(Column.is_pk).order_by(Column.id).all()
 
     def get_primary_key_names(self):
-        primary_keys = []
-        for column in self.columns:
-            if column.is_primary():
-                primary_keys.append(column.column_name)
-        return primary_keys
+        return [name for name, in self.columns.filter(Column.is_pk).order_by(Column.id)
+                .with_entities(Column.column_name)]
 
     def get_foreign_keys(self):
-        foreign_keys = []
-        for column in self.columns:
-            if column.is_foreign():
-                foreign_keys.append(column)
-        return foreign_keys
+        return self.columns.filter(Column.is_fk).order_by(Column.id).all()
 
     def get_foreign_key_names(self):
-        foreign_keys = []
-        for column in self.columns:
-            if column.is_foreign():
-                foreign_keys.append(column.column_name)
-        return foreign_keys
+        return [name for name, in self.columns.filter(Column.is_fk).order_by(Column.id)
+                .with_entities(Column.column_name)]
 
     def get_relations(self):
         keys = []
@@ -0,0 +1,31 @@
+from app.schemas.input_db_conn_schema import input_db_conn_schema
+
+batch_db_conn_schema = {
+    "type": "object",
+    "properties": {
+        "connections": {
+            "type": "array",
+            "description": "Candidate connections, each as accepted by the registration resource",
+            "items": input_db_conn_schema,
+            "minItems": 1,
+            "maxItems": 100
+        }
+    },
+    "additionalProperties": False,
+    "required": ["connections"]
+}
+
+bulk_db_conn_schema = {
+    "type": "object",
+    "properties": {
+        "connections": {
+            "type": "array",
+            "description": "Connections to register, each as accepted by the registration resource",
+            "items": input_db_conn_schema,
+            "minItems": 1,
+            "maxItems": 1000
+        }
+    },
+    "additionalProperties": False,
+    "required": ["connections"]
+}
@@ -28,6 +28,39 @@ input_db_conn_schema = {
             "type": "string",
             "description": "Database Name of The client",
             "minLength": 1
+        },
+        "crawl_concurrency": {
+            "type": "integer",
+            "description": "Number of tables reflected concurrently while crawling",
+            "minimum": 1,
+            "maximum": 32
+        },
+        "crawl_schemas": {
+            "type": "array",
+            "description": "Schemas to crawl, every schema of the database when left out",
+            "items": {"type": "string", "minLength": 1, "maxLength": 80},
+            "uniqueItems": True
+        },
+        "crawl_include": {
+            "type": "array",
+            "description": "Table patterns to crawl, globs or regular expressions prefixed with 're:'",
+            "items": {"type": "string", "minLength": 1, "maxLength": 255},
+            "uniqueItems": True
+        },
+        "crawl_exclude": {
+            "type": "array",
+            "description": "Table patterns never crawled, globs or regular expressions prefixed with 're:'",
+            "items": {"type": "string", "minLength": 1, "maxLength": 255},
+            "uniqueItems": True
+        },
+        "crawl_max_tables": {
+            "type": "integer",
+            "description": "Most tables crawled per schema, the first ones by name",
+            "minimum": 1
+        },
+        "collapse_partitions": {
+            "type": "boolean",
+            "description": "Crawl partitioned tables as their parent table alone"
         }
     },
     "additionalProperties": False,
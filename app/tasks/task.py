@@ -1,14 +1,26 @@
 import random
 import time
+from datetime import datetime
 from flask import current_app
-from celery.signals import task_postrun, worker_process_init, task_prerun
+from celery import chord, group
+from celery.signals import task_postrun, worker_process_init, task_prerun, worker_process_shutdown, worker_shutdown
+from celery.utils import uuid
 from celery.utils.log import get_task_logger
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker, scoped_session
 
-from app import celery, db, create_app
-from app.models.column import Column
-from app.models.database import Database
+from app import celery, db, create_app, engine_registry
+from app.crawler.graph import store_graph
+from app.crawler.index import MetadataIndex
+from app.crawler.instrumentation import CrawlInstrumentation, merge_reports, snapshot_rows
+from app.crawler.progress import ProgressReporter, publish, redis_client
+from app.crawler.scheduler import plan_refreshes
+from app.crawler.search import database_names, index_database, prune_names
+from app.crawler.snapshot import SchemaSnapshot, TableSnapshot
+from app.crawler.sync import MetadataSync
+from app.crawler.writer import MetadataWriter, chunks
+from app.models.crawl_run import CrawlRun
+from app.models.database import Database, MULTI_SCHEMA_TYPES
 from app.models.foreignkey import ForeignKey
 from app.models.message import Message
 from app.models.table import Table
@@ -33,13 +45,27 @@ class SQLASessionTask(celery.Task):
             self._session = Session(bind=engine)
         return self._session
 
+    def progress(self):
+        """throttled progress reporting for one run of the task, see ProgressReporter"""
+        config = current_app.config
+        return ProgressReporter(self, redis_client(config['PROGRESS_REDIS_URL']),
+                                 min_interval=config['PROGRESS_MIN_INTERVAL'], min_delta=config['PROGRESS_MIN_DELTA'])
+
+    def publish_state(self, task_id, state, meta):
+        publish(redis_client(current_app.config['PROGRESS_REDIS_URL']), task_id, state, meta)
+
     def on_success(self, retval, task_id, args, kwargs):
         print('success')
+        self.publish_state(task_id, 'SUCCESS', retval if isinstance(retval, dict) else {'result': retval})
         Session.remove()
         # pass
 
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        self.publish_state(task_id, 'RETRY', {'status': str(exc)})
+
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         print('failure')
+        self.publish_state(task_id, 'FAILURE', {'status': str(exc)})
         Session.remove()
         # pass
 
@@ -92,96 +118,317 @@ def save_metadata(self, db_id):
     total = 100
     current = 0
     message = 'pending'
+    started = time.time()
     db_session = self.session
-    self.update_state(state='PROGRESS',
-                      meta={'current': current, 'total': total,
-                            'status': message})
+    progress = self.progress()
+    instrumentation = CrawlInstrumentation(db_session.get_bind(), on_stage=progress.stage)
+    progress.update(current, total, message)
+    reflection = None
     try:
         # database = Database.query.get(db_id)
         database = db_session.query(Database).get(db_id)
-        total = prepare_metadata(database)
-        new_tables = []
-        self.update_state(state='PROGRESS',
-                          meta={'current': current, 'total': total,
-                                'status': message})
-        for table_name in database.get_remote_tables():
-            table_db = save_table(table_name, database, db_session)
-            new_tables.append(table_db)
-            current += 1
-            self.update_state(state='PROGRESS',
-                              meta={'current': current, 'total': total,
-                                    'status': message})
-        for table in new_tables:
-            columns = []
-            for column in database.get_remote_columns(table_name=table.table_name):
-                new_column = save_column(column, table, db_session)
-                columns.append(new_column)
-                current += 1
-                self.update_state(state='PROGRESS',
-                                  meta={'current': current, 'total': total,
-                                        'status': message})
-            for pk in database.get_remote_primary_keys(table_name=table.table_name):
-                pk_column = db_session.query(Column).filter(Column.column_name == pk,
-                                                            Column.table_id == table.id).first()
-                pk_column.is_pk = True
-                db_session.add(pk_column)
-                db_session.commit()
-                current += 1
-                self.update_state(state='PROGRESS',
-                                  meta={'current': current, 'total': total,
-                                        'status': message})
-
-            for fk in database.get_remote_foreign_keys(table_name=table.table_name):
-                fk_column = db_session.query(Column).filter(Column.column_name == fk['constrained_columns'][0],
-                                                            Column.table_id == table.id).first()
-                fk_column.is_fk = True
-                db_session.add(fk_column)
-                db_session.commit()
-                current += 1
-                self.update_state(state='PROGRESS',
-                                  meta={'current': current, 'total': total,
-                                        'status': message})
-
-        for table in new_tables:
-            for column in table.columns:
-                if column.is_fk is True:
-                    for fk in database.get_remote_foreign_keys(table_name=table.table_name):
-                        if column.column_name == fk['constrained_columns'][0]:
-                            referred_table = db_session.query(Table).filter(Table.table_name == fk['referred_table'],
-                                                                            Table.database_id == database.id) \
-                                .first()
-                            referred_column = db_session.query(Column) \
-                                .filter(Column.column_name == fk['referred_columns'][0],
-                                        Column.table_id == referred_table.id).first()
-                            fk_key = ForeignKey(column_id=column.id, table_id=column.table_id,
-                                                referred_column_id=referred_column.id,
-                                                referred_table_id=referred_table.id)
-                            db_session.add(fk_key)
-                            db_session.commit()
-                            current += 1
-                            self.update_state(state='PROGRESS',
-                                              meta={'current': current, 'total': total,
-                                                    'status': message})
+        workers, schema_workers = crawl_concurrency(database)
+        reflection = database.reflection_session(workers=workers, schema_workers=schema_workers)
+        instrumentation.stage('signal')
+        schemas = database.get_remote_schemas(reflection=reflection)
+        # taken before reflecting so changes made during the crawl show up on the next refresh
+        signal = database.get_remote_schema_signal(reflection=reflection, schemas=schemas)
+        instrumentation.stage('reflect')
+        threshold = current_app.config['CRAWL_DISTRIBUTED_THRESHOLD']
+        if threshold:
+            # a bare listing, the catalog of a schema too large for one task is read chunk by chunk
+            table_names = [(schema, reflection.get_table_names(dependency_order=False, schema=schema))
+                           for schema in schemas]
+            if sum(len(names) for schema, names in table_names) > threshold:
+                return fan_out_metadata(database, table_names, signal, started, reflection.stats.get('skipped'))
+        snapshot = prepare_metadata(reflection, workers=workers, schemas=schemas, schema_workers=schema_workers,
+                                    progress=progress)
+        total = snapshot.total
+        progress.update(current, total, message, force=True)
+        writer = MetadataWriter(db_session, database.id, chunk_size=current_app.config['CRAWL_WRITE_CHUNK_SIZE'],
+                                on_progress=progress.advance, on_stage=instrumentation.stage)
+        writer.write(snapshot)
+        current = total
+        instrumentation.stage('finalize')
         database.status = 'processed'
+        database.bump_generation()
+        database.schema_signal = signal
+        database.signal_checked_at = datetime.utcnow()
+        database.record_crawl(time.time() - started)
         db_session.add(database)
+        store_graph(db_session, database)
+        index_database(db_session, database.id, current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        report = instrumentation.report(reflection.stats, snapshot_rows(snapshot), writer.stats, progress.stats)
+        db_session.add(CrawlRun.from_report(database.id, 'crawl', 'completed', report, started, self.request.id))
         db_session.commit()
         return {'current': current, 'total': total, 'status': 'completed',
-                'result': database.id}
+                'result': database.id, 'reflection': reflection.stats, 'persistence': writer.stats,
+                'progress': progress.stats, 'instrumentation': report}
     except Exception as e:
-        db_session.query(Table).filter(Table.database_id == db_id).delete()
-        db_session.commit()
-        database = db_session.query(Database).filter(Database.id == db_id).first()
-        database.status = 'failed'
-        db_session.add(database)
-        db_session.commit()
+        db_session.rollback()
+        discard_metadata(db_id, db_session)
+        record_failed_run(db_session, db_id, 'crawl', instrumentation, reflection, started, self.request.id, e)
         current_app.logger.error(str(e))
         message = 'failed'
         error = str(e)
         self.retry(exc=e, countdown=2, max_retries=2)
+    finally:
+        instrumentation.finish()
+        if reflection is not None:
+            reflection.dispose()
     return {'current': current, 'total': total, 'status': message,
             'result': db_id, 'error': error}
 
 
+@celery.task(base=SQLASessionTask, bind=True)
+def recrawl_metadata(self, db_id, force=False):
+    """
+    refresh the stored metadata of a crawled database, only tables whose fingerprint changed are written.
+    unless forced the crawl is skipped altogether when the remote schema signal did not change.
+    """
+    total = 100
+    started = time.time()
+    db_session = self.session
+    progress = self.progress()
+    instrumentation = CrawlInstrumentation(db_session.get_bind(), on_stage=progress.stage)
+    progress.update(0, total, 'pending', force=True)
+    reflection = None
+    try:
+        database = db_session.query(Database).get(db_id)
+        workers, schema_workers = crawl_concurrency(database)
+        reflection = database.reflection_session(workers=workers, schema_workers=schema_workers)
+        instrumentation.stage('signal')
+        schemas = database.get_remote_schemas(reflection=reflection)
+        signal = database.get_remote_schema_signal(reflection=reflection, schemas=schemas)
+        database.signal_checked_at = datetime.utcnow()
+        if not force and database.is_unchanged(signal):
+            database.crawls_skipped = (database.crawls_skipped or 0) + 1
+            database.record_crawl()
+            db_session.add(database)
+            report = instrumentation.report(reflection.stats, progress=progress.stats)
+            db_session.add(CrawlRun.from_report(db_id, 'recrawl', 'skipped', report, started, self.request.id))
+            db_session.commit()
+            logger.info('schema of database %s unchanged, crawl skipped (%s so far)', db_id, database.crawls_skipped)
+            return {'current': 1, 'total': 1, 'status': 'skipped', 'result': db_id,
+                    'crawls_skipped': database.crawls_skipped, 'reflection': reflection.stats,
+                    'instrumentation': report}
+        instrumentation.stage('reflect')
+        snapshot = prepare_metadata(reflection, workers=workers, schemas=schemas, schema_workers=schema_workers,
+                                    progress=progress)
+        total = snapshot.total
+        progress.update(0, total, 'pending')
+        instrumentation.stage('sync')
+        sync = MetadataSync(db_session, db_id, chunk_size=current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        sync.apply(snapshot)
+        instrumentation.stage('finalize')
+        database.status = 'processed'
+        database.bump_generation()
+        database.schema_signal = signal
+        database.record_crawl(time.time() - started)
+        db_session.add(database)
+        store_graph(db_session, database)
+        index_database(db_session, database.id, current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        report = instrumentation.report(reflection.stats, snapshot_rows(snapshot), sync.writer.stats, progress.stats)
+        db_session.add(CrawlRun.from_report(db_id, 'recrawl', 'completed', report, started, self.request.id))
+        db_session.commit()
+        return {'current': total, 'total': total, 'status': 'completed', 'result': db_id,
+                'changes': sync.stats, 'reflection': reflection.stats, 'instrumentation': report}
+    except Exception as e:
+        # the previous crawl stays in place, nothing of this run was committed
+        db_session.rollback()
+        database = db_session.query(Database).get(db_id)
+        database.record_failure()
+        db_session.add(database)
+        db_session.commit()
+        record_failed_run(db_session, db_id, 'recrawl', instrumentation, reflection, started, self.request.id, e)
+        current_app.logger.error(str(e))
+        raise
+    finally:
+        instrumentation.finish()
+        if reflection is not None:
+            reflection.dispose()
+
+
+@celery.task(base=SQLASessionTask, bind=True)
+def schedule_refreshes(self):
+    """periodic task enqueueing a refresh for every database that went stale, see plan_refreshes"""
+    config = current_app.config
+    db_session = self.session
+    now = datetime.utcnow()
+    plan = plan_refreshes(db_session.query(Database).all(), now,
+                          interval=config['CRAWL_REFRESH_INTERVAL'], tick=config['CRAWL_SCHEDULE_TICK'],
+                          max_per_host=config['CRAWL_MAX_PER_HOST'], max_per_tick=config['CRAWL_MAX_PER_TICK'],
+                          timeout=config['CRAWL_REFRESH_TIMEOUT'], backoff=config['CRAWL_RETRY_BACKOFF'],
+                          max_backoff=config['CRAWL_RETRY_BACKOFF_MAX'])
+    # mark before enqueueing so an overlapping tick cannot pick the same database twice
+    for database, countdown in plan:
+        database.refresh_enqueued_at = now
+        db_session.add(database)
+    db_session.commit()
+    for database, countdown in plan:
+        recrawl_metadata.apply_async((database.id,), countdown=countdown)
+    logger.info('scheduled %s refreshes', len(plan))
+    return {'enqueued': [[database.id, countdown] for database, countdown in plan]}
+
+
+def enqueue_crawls(database_ids, per_minute=60):
+    """
+    One crawl per database as a single Celery group. Countdowns are staggered so at most per_minute crawls
+    start a minute. The group result is saved, its id is the aggregated progress handle of the batch.
+    """
+    interval = 60.0 / per_minute if per_minute else 0
+    result = group(save_metadata.s(db_id).set(countdown=round(index * interval, 3))
+                   for index, db_id in enumerate(database_ids)).apply_async()
+    result.save()
+    return result
+
+
+def fan_out_metadata(database, table_names, signal=None, started=None, skipped=None):
+    """
+    Split a crawl into chunks of tables, each reflected and stored by its own subtask.
+    table_names holds a (schema, names) pair per schema, a chunk never spans two schemas.
+    A chord callback links the foreign keys across chunks once every chunk is stored.
+    The tables were filtered when listed, skipped carries the counts into the callback's report.
+    """
+    db_id = database.id
+    schema_chunks = [(schema, table_chunk) for schema, names in table_names
+                     for table_chunk in chunks(names, current_app.config['CRAWL_CHUNK_TABLES'])]
+    table_chunks = [table_chunk for schema, table_chunk in schema_chunks]
+    header = [save_metadata_chunk.s(db_id, table_chunk, schema).set(task_id=uuid())
+              for schema, table_chunk in schema_chunks]
+    callback = link_metadata_chunks.s(db_id, signal, started or time.time(), skipped) \
+        .on_error(crawl_failed.si(db_id))
+    result = chord(header)(callback)
+    return {'current': 0, 'total': sum(len(table_chunk) for table_chunk in table_chunks), 'status': 'dispatched',
+            'result': db_id,
+            'subtasks': [[sig.options['task_id'], len(table_chunk)] for sig, table_chunk in zip(header, table_chunks)],
+            'callback': result.id}
+
+
+@celery.task(base=SQLASessionTask, bind=True, max_retries=2)
+def save_metadata_chunk(self, db_id, table_names, schema=None):
+    """reflect and store one chunk of tables of a schema, its foreign keys are returned for the chord callback"""
+    total = len(table_names)
+    current = 0
+    db_session = self.session
+    progress = self.progress()
+    instrumentation = CrawlInstrumentation(db_session.get_bind(), on_stage=progress.stage)
+    reflection = None
+    try:
+        database = db_session.query(Database).get(db_id)
+        workers = database.get_crawl_concurrency(current_app.config['CRAWL_CONCURRENCY'])
+        # the chunk's tables already went through the crawl filters when the crawl was split
+        reflection = database.reflection_session(workers=workers, filtered=False)
+        instrumentation.stage('reflect')
+        snapshot = SchemaSnapshot.capture(reflection, workers=workers, table_names=table_names, schema=schema)
+        total = snapshot.total
+        progress.update(current, total, 'pending', force=True)
+        writer = MetadataWriter(db_session, db_id, chunk_size=current_app.config['CRAWL_WRITE_CHUNK_SIZE'],
+                                on_progress=progress.advance, on_stage=instrumentation.stage)
+        writer.write(snapshot, foreign_keys=False)
+        instrumentation.stage('commit')
+        db_session.commit()
+        foreign_keys = [[table.name, [column['name'] for column in table.columns], table.foreign_keys, table.schema]
+                        for table in snapshot if table.foreign_keys]
+        report = instrumentation.report(reflection.stats, snapshot_rows(snapshot), writer.stats, progress.stats)
+        return {'current': total, 'total': total, 'status': 'completed', 'result': db_id,
+                'foreign_keys': foreign_keys, 'reflection': reflection.stats, 'persistence': writer.stats,
+                'instrumentation': report}
+    except Exception as e:
+        # drop what this chunk stored so a retry starts clean, the other chunks are left alone
+        db_session.rollback()
+        if reflection is not None:
+            stored_schema = reflection.stored_schema(schema)
+            db_session.query(Table).filter(Table.database_id == db_id, Table.table_name.in_(table_names),
+                                           Table.schema_name.is_(None) if stored_schema is None
+                                           else Table.schema_name == stored_schema) \
+                .delete(synchronize_session=False)
+            db_session.commit()
+        current_app.logger.error(str(e))
+        raise self.retry(exc=e, countdown=2)
+    finally:
+        instrumentation.finish()
+        if reflection is not None:
+            reflection.dispose()
+
+
+@celery.task(base=SQLASessionTask, bind=True)
+def link_metadata_chunks(self, results, db_id, signal=None, started=None, skipped=None):
+    """chord callback: link the foreign keys of every chunk and mark the database processed"""
+    db_session = self.session
+    instrumentation = CrawlInstrumentation(db_session.get_bind())
+    try:
+        instrumentation.stage('fks')
+        tables = [TableSnapshot(name=table_name, columns=[{'name': name} for name in column_names],
+                                primary_keys=[], foreign_keys=foreign_keys, schema=schema)
+                  for result in results for table_name, column_names, foreign_keys, schema in result['foreign_keys']]
+        writer = MetadataWriter(db_session, db_id, chunk_size=current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        writer.index = MetadataIndex.load(db_session, db_id)
+        writer.write_foreign_keys(SchemaSnapshot(None, tables))
+        instrumentation.stage('finalize')
+        database = db_session.query(Database).get(db_id)
+        database.status = 'processed'
+        database.bump_generation()
+        database.schema_signal = signal
+        database.signal_checked_at = datetime.utcnow()
+        database.record_crawl(time.time() - started if started else None)
+        db_session.add(database)
+        store_graph(db_session, database)
+        index_database(db_session, database.id, current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        report = merge_reports([result['instrumentation'] for result in results if 'instrumentation' in result],
+                               instrumentation.report(persistence=writer.stats))
+        if started:
+            report['seconds'] = round(time.time() - started, 3)
+        if skipped is not None:
+            report['skipped'] = skipped
+        db_session.add(CrawlRun.from_report(db_id, 'distributed', 'completed', report, started, self.request.id))
+        db_session.commit()
+        total = sum(result['total'] for result in results)
+        return {'current': total, 'total': total, 'status': 'completed', 'result': db_id,
+                'persistence': writer.stats, 'instrumentation': report}
+    except Exception as e:
+        db_session.rollback()
+        discard_metadata(db_id, db_session)
+        record_failed_run(db_session, db_id, 'distributed', instrumentation, None, started, self.request.id, e)
+        current_app.logger.error(str(e))
+        raise
+    finally:
+        instrumentation.finish()
+
+
+@celery.task(base=SQLASessionTask, bind=True)
+def crawl_failed(self, db_id):
+    """error callback of a distributed crawl"""
+    discard_metadata(db_id, self.session)
+
+
+def discard_metadata(db_id, session):
+    """remove whatever a failed crawl stored, and the search terms only it used, and mark the database failed"""
+    names = database_names(session, db_id)
+    table_ids = select([Table.id]).where(Table.database_id == db_id)
+    session.query(ForeignKey).filter(ForeignKey.table_id.in_(table_ids)).delete(synchronize_session=False)
+    session.query(Table).filter(Table.database_id == db_id).delete(synchronize_session=False)
+    prune_names(session, names, current_app.config['CRAWL_WRITE_CHUNK_SIZE'])
+    session.commit()
+    database = session.query(Database).filter(Database.id == db_id).first()
+    database.status = 'failed'
+    database.bump_generation()
+    database.record_failure()
+    session.add(database)
+    session.commit()
+
+
+def record_failed_run(session, db_id, kind, instrumentation, reflection, started, task_id, error):
+    """keep the figures of a failed crawl in its history, recording them never hides the crawl's own error"""
+    try:
+        report = instrumentation.report(reflection.stats if reflection is not None else None)
+        session.add(CrawlRun.from_report(db_id, kind, 'failed', report, started, task_id, str(error)))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.warning('crawl run of database %s not recorded: %s', db_id, e)
+
+
 @task_postrun.connect
 def close_session(*args, **kwargs):
     # Flask SQLAlchemy will automatically create new sessions for you from
@@ -204,49 +451,34 @@ def init_celery_flask_app(**kwargs):
     # app.app_context().push()
 
 
-def save_table(table_name, database, session):
-    table_db = Table(table_name=table_name)
-    database.tables.append(table_db)
-    session.add(table_db)
-    session.commit()
-    return table_db
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def dispose_engines(**kwargs):
+    # close the pooled remote connections instead of leaving them to time out on the servers
+    engine_registry.dispose_all()
 
 
-def save_column(column, table, session):
-    ncol = Column(column_name=str(column.get('name', 'default_column_name')),
-                  column_type=str(getattr(column.get('type'), '__visit_name__')),
-                  column_default=column.get('default', None),
-                  is_nullable=bool(column.get('nullable', True)),
-                  is_autoincrement=bool(column.get('autoincrement', False)))
-    table.columns.append(ncol)
-    session.add(ncol)
-    session.commit()
-    return ncol
-
-
-def save_fk(column, new_column, db_id, session):
-    fks = getattr(column, 'foreign_keys')
-    if len(fks) > 0:
-        parent = str(getattr(next(iter(fks)), '_colspec')).split('.')[0]
-        # parent_table = Table.query.filter_by(table_name=parent, database_id=db_id).first()
-        parent_table = session.query(Table).filter(Table.table_name == parent,
-                                                   Table.database_id == db_id).first()
-        # scol = Column.query.filter_by(column_name=ncol.column_name, table_id=parent_table.id).first()
-        scol = session.query(Column).filter(Column.column_name == new_column.column_name,
-                                            Column.table_id == parent_table.id).first()
-        fk_key = ForeignKey(column_id=new_column.id, table_id=new_column.table_id, referred_column_id=scol.id,
-                            referred_table_id=scol.table_id)
-        session.add(fk_key)
-        session.commit()
+def crawl_concurrency(database):
+    """reflection threads per schema and schemas reflected side by side when crawling the database"""
+    workers = database.get_crawl_concurrency(current_app.config['CRAWL_CONCURRENCY'])
+    schema_workers = current_app.config['CRAWL_SCHEMA_CONCURRENCY'] if database.dbtype in MULTI_SCHEMA_TYPES else 1
+    return workers, schema_workers
 
 
-def prepare_metadata(database):
+def prepare_metadata(reflection, workers=1, schemas=None, schema_workers=1, progress=None):
+    """
+    reflect the remote schemas once, every later stage of the crawl reads from the snapshot.
+    each schema is reported to the progress as its own part with its own total
+    """
     print('calculation')
-    total = 0
-    total = total + len(database.get_remote_tables())
-    for table_name in database.get_remote_tables():
-        total = total + len(database.get_remote_columns(table_name=table_name))
-        total = total + len(database.get_remote_primary_keys(table_name=table_name))
-        total = total + len(database.get_remote_foreign_keys(table_name=table_name)) * 2
+    on_captured = None
+    if progress is not None and schemas and schemas != [None]:
+        progress.add_parts([schema or reflection.schema for schema in schemas], status='pending')
+
+        def on_captured(schema, snapshot):
+            progress.part(schema or reflection.schema, status='reflected', tables=len(snapshot),
+                          total=snapshot.total)
+    snapshot = SchemaSnapshot.capture_schemas(reflection, schemas or [None], workers=workers,
+                                              schema_workers=schema_workers, on_captured=on_captured)
     print('calculation done')
-    return total
+    return snapshot
@@ -0,0 +1,99 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from sqlalchemy import exc
+
+logger = logging.getLogger(__name__)
+
+
+def failure_reason(error):
+    """short reason of a failed ping, the driver message without its error code when it has one"""
+    if isinstance(error, exc.DBAPIError) and error.orig is not None:
+        args = getattr(error.orig, 'args', ())
+        if len(args) > 1:
+            return str(args[1]).split('(')[0].rstrip(' ')
+        return str(error.orig).strip()
+    return str(error)
+
+
+class ConnectionValidator(object):
+    """
+    Pings candidate connections on bounded thread pools so a slow network never holds a web worker for
+    longer than the per dbtype deadline of VALIDATION_TIMEOUT. A deadline runs from submission, a ping
+    past it is reported as timed out, its thread finishes in the background within the driver's own
+    connect timeout and a ping still queued is cancelled. Batches run on a pool of their own, a single
+    registration never queues behind them.
+    Candidates are pinged on a throwaway engine outside the engine registry, a registered connection
+    gets its pool on first use.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 16
+        self.batch_workers = 64
+        self.timeouts = {}
+        self.default_timeout = 10
+        self.executors = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config['VALIDATION_WORKERS']
+        self.batch_workers = app.config['VALIDATION_BATCH_WORKERS']
+        self.timeouts = app.config['VALIDATION_TIMEOUT']
+
+    def timeout(self, dbtype):
+        return self.timeouts.get(dbtype, self.default_timeout)
+
+    def _executor(self, batch=False):
+        if batch not in self.executors:
+            self.executors[batch] = ThreadPoolExecutor(max_workers=self.batch_workers if batch else self.workers)
+        return self.executors[batch]
+
+    @staticmethod
+    def _ping(database, begun):
+        begun.append(time.time())
+        engine = None
+        try:
+            engine = database.get_candidate_engine()
+            database.ping_connection(engine)
+            reason = None
+        except Exception as e:
+            logger.info('ping of %s failed: %s', database.hostname, e)
+            reason = failure_reason(e)
+        finally:
+            if engine is not None:
+                engine.dispose()
+        return reason, time.time() - begun[0]
+
+    def validate(self, databases, batch=False):
+        """
+        ping every database concurrently, [{'valid', 'latency_ms', 'reason'}] in the given order.
+        every ping gets the deadline of its dbtype from submission, so a call returns within its slowest
+        deadline whatever the size of the batch. pings the pool could not start in time are not validated
+        """
+        executor = self._executor(batch)
+        submitted = time.time()
+        pings = []
+        for database in databases:
+            begun = []
+            pings.append((database, begun, executor.submit(self._ping, database, begun)))
+        results = []
+        for database, begun, future in pings:
+            timeout = self.timeout(database.dbtype)
+            try:
+                reason, seconds = future.result(max(0, submitted + timeout - time.time()))
+            except TimeoutError:
+                seconds = None
+                if future.cancel() or not begun:
+                    reason = 'not validated within %g seconds, too many pings pending' % timeout
+                else:
+                    reason = 'no answer within %g seconds' % timeout
+            results.append({'valid': reason is None, 'reason': reason,
+                            'latency_ms': round(seconds * 1000, 1) if seconds is not None else None})
+        return results
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        self.executors = {}
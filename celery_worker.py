@@ -5,6 +5,7 @@ from celery import Celery
 from app import create_app
 
 # from app.tasks.task import log, reverse_messages
+from app.tasks.task import schedule_refreshes
 
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -35,6 +36,10 @@ def create_celery(app):
 
 celery = create_celery(app)
 
+# enqueue refreshes of stale databases every scheduler tick, run the worker with -B or a separate beat
+celery.add_periodic_task(float(app.config['CRAWL_SCHEDULE_TICK']), schedule_refreshes.s(),
+                         name='schedule metadata refreshes')
+
 # @celery.on_after_configure.connect
 # def setup_periodic_tasks(sender, **kwargs):
 #     # Calls reverse_messages every 10 seconds.
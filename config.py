@@ -26,6 +26,70 @@ class BaseConfig:
     CELERY_SEND_TASK_SENT_EVENT = True
     CELERY_BROKER_URL = BROKER_URL
     CELERY_RESULT_BACKEND = BROKER_URL
+    # rows per multi-row INSERT when persisting a crawl
+    CRAWL_WRITE_CHUNK_SIZE = int(os.environ.get('CRAWL_WRITE_CHUNK_SIZE', 1000))
+    # reflection threads per crawl for each dbtype, a Database row can override it with crawl_concurrency
+    CRAWL_CONCURRENCY = {
+        'mysql': int(os.environ.get('CRAWL_CONCURRENCY_MYSQL', 1)),
+        'mssql': int(os.environ.get('CRAWL_CONCURRENCY_MSSQL', 1)),
+        'postgresql': int(os.environ.get('CRAWL_CONCURRENCY_POSTGRESQL', 1))
+    }
+    # schemas with more tables than this are crawled as a chord of chunk subtasks, 0 disables it
+    CRAWL_DISTRIBUTED_THRESHOLD = int(os.environ.get('CRAWL_DISTRIBUTED_THRESHOLD', 0))
+    CRAWL_CHUNK_TABLES = int(os.environ.get('CRAWL_CHUNK_TABLES', 500))
+    # schemas of a postgresql or mssql database reflected side by side, each with its own reflection threads
+    CRAWL_SCHEMA_CONCURRENCY = int(os.environ.get('CRAWL_SCHEMA_CONCURRENCY', 4))
+    # periodic refresh: databases older than the interval are re-crawled, spread over each scheduler tick
+    CRAWL_REFRESH_INTERVAL = int(os.environ.get('CRAWL_REFRESH_INTERVAL', 6 * 3600))
+    CRAWL_SCHEDULE_TICK = int(os.environ.get('CRAWL_SCHEDULE_TICK', 300))
+    CRAWL_MAX_PER_HOST = int(os.environ.get('CRAWL_MAX_PER_HOST', 2))
+    CRAWL_MAX_PER_TICK = int(os.environ.get('CRAWL_MAX_PER_TICK', 50))
+    CRAWL_REFRESH_TIMEOUT = int(os.environ.get('CRAWL_REFRESH_TIMEOUT', 3600))
+    # seconds before retrying a database whose crawl failed, doubled per failure in a row up to the max
+    CRAWL_RETRY_BACKOFF = int(os.environ.get('CRAWL_RETRY_BACKOFF', 300))
+    CRAWL_RETRY_BACKOFF_MAX = int(os.environ.get('CRAWL_RETRY_BACKOFF_MAX', 86400))
+    # rows per page of the tables, columns and relations listings
+    METADATA_PAGE_SIZE = int(os.environ.get('METADATA_PAGE_SIZE', 100))
+    METADATA_MAX_PAGE_SIZE = int(os.environ.get('METADATA_MAX_PAGE_SIZE', 1000))
+    # tables loaded per batch while streaming a schema export
+    EXPORT_BATCH_TABLES = int(os.environ.get('EXPORT_BATCH_TABLES', 500))
+    # serialized metadata kept per process, set METADATA_CACHE_REDIS_URL (e.g. to REDIS_URL) to share it
+    METADATA_CACHE_SIZE = int(os.environ.get('METADATA_CACHE_SIZE', 128))
+    METADATA_CACHE_TTL = int(os.environ.get('METADATA_CACHE_TTL', 3600))
+    METADATA_CACHE_REDIS_URL = os.environ.get('METADATA_CACHE_REDIS_URL')
+    # decoded foreign key graphs kept per process, and the widest neighbourhood a request may ask for
+    SCHEMA_GRAPH_CACHE_SIZE = int(os.environ.get('SCHEMA_GRAPH_CACHE_SIZE', 16))
+    SCHEMA_GRAPH_MAX_HOPS = int(os.environ.get('SCHEMA_GRAPH_MAX_HOPS', 10))
+    # name search: trigram similarity cut off, similar names considered per query and result page sizes
+    SEARCH_MIN_SIMILARITY = float(os.environ.get('SEARCH_MIN_SIMILARITY', 0.3))
+    SEARCH_MAX_TERMS = int(os.environ.get('SEARCH_MAX_TERMS', 50))
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 20))
+    SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', 200))
+    # task progress is stored and published at most every PROGRESS_MIN_INTERVAL seconds unless it moved by
+    # PROGRESS_MIN_DELTA, events go to Redis pub/sub for the progress streams, unset the url to turn them off
+    PROGRESS_REDIS_URL = os.environ.get('PROGRESS_REDIS_URL', BROKER_URL)
+    PROGRESS_MIN_INTERVAL = float(os.environ.get('PROGRESS_MIN_INTERVAL', 0.5))
+    PROGRESS_MIN_DELTA = float(os.environ.get('PROGRESS_MIN_DELTA', 0.01))
+    PROGRESS_STREAM_HEARTBEAT = int(os.environ.get('PROGRESS_STREAM_HEARTBEAT', 15))
+    PROGRESS_STREAM_TIMEOUT = int(os.environ.get('PROGRESS_STREAM_TIMEOUT', 3600))
+    # remote engines kept open per process, the least recently used pool is disposed beyond the size
+    # and pools unused for ENGINE_IDLE_TTL seconds are disposed on the next lookup
+    ENGINE_REGISTRY_SIZE = int(os.environ.get('ENGINE_REGISTRY_SIZE', 32))
+    ENGINE_IDLE_TTL = int(os.environ.get('ENGINE_IDLE_TTL', 600))
+    # connection pings run on a thread pool, each answered within the deadline of its dbtype in seconds,
+    # batches of the validation and bulk registration resources on a pool of their own
+    VALIDATION_WORKERS = int(os.environ.get('VALIDATION_WORKERS', 16))
+    VALIDATION_BATCH_WORKERS = int(os.environ.get('VALIDATION_BATCH_WORKERS', 64))
+    VALIDATION_TIMEOUT = {
+        'mysql': float(os.environ.get('VALIDATION_TIMEOUT_MYSQL', 5)),
+        'mssql': float(os.environ.get('VALIDATION_TIMEOUT_MSSQL', 10)),
+        'postgresql': float(os.environ.get('VALIDATION_TIMEOUT_POSTGRESQL', 5))
+    }
+    # crawls a bulk registration starts per minute, 0 starts them all at once
+    BULK_CRAWLS_PER_MINUTE = int(os.environ.get('BULK_CRAWLS_PER_MINUTE', 60))
+    # crawl runs per page of a database's crawl history
+    CRAWL_HISTORY_PAGE_SIZE = int(os.environ.get('CRAWL_HISTORY_PAGE_SIZE', 20))
+    CRAWL_HISTORY_MAX_PAGE_SIZE = int(os.environ.get('CRAWL_HISTORY_MAX_PAGE_SIZE', 200))
 
 
 class DevelopmentConfig(BaseConfig):
@@ -35,5 +35,32 @@ def recreatedb():
     db.session.commit()
 
 
+@app.cli.command('export-schema')
+@click.argument('db_id', type=int)
+@click.option('--format', 'export_format', type=click.Choice(['ndjson', 'json']), default='ndjson')
+@click.option('--output', type=click.File('w'), default='-', help='file to write, stdout by default')
+def export_schema(db_id, export_format, output):
+    """Stream the crawled schema of a database as NDJSON or JSON"""
+    from app.models.database import Database
+    from app.models.serializer import EXPORT_FORMATS
+    database = Database.query.get(db_id)
+    if database is None:
+        raise click.ClickException('Database %d not found' % db_id)
+    export, mimetype = EXPORT_FORMATS[export_format]
+    for chunk in export(db.session, database, app.config['EXPORT_BATCH_TABLES']):
+        output.write(chunk)
+
+
+@app.cli.command('index-search')
+def index_search():
+    """Add the names of every crawled database to the search index, e.g. after upgrading"""
+    from app.crawler.search import index_database
+    from app.models.database import Database
+    for database_id, in db.session.query(Database.id).filter(Database.status == 'processed'):
+        added = index_database(db.session, database_id, app.config['CRAWL_WRITE_CHUNK_SIZE'])
+        db.session.commit()
+        click.echo('database %d: %d new terms' % (database_id, added))
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,67 @@
+"""
+Wall-clock scaling of per table reflection from 1 to N workers.
+
+    python scripts/bench_reflection.py --tables 200 --workers 1 2 4 8 --latency 5
+
+Without --url a throwaway SQLite file is used as the remote database, --latency adds a
+sleep to every statement to stand in for the network round-trip to a customer server.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event  # noqa: E402
+
+from app.crawler.reflection import ReflectionSession  # noqa: E402
+from app.crawler.snapshot import SchemaSnapshot  # noqa: E402
+
+
+def create_schema(url, tables):
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute('CREATE TABLE t0 (id INTEGER PRIMARY KEY, name VARCHAR(80))')
+        for i in range(1, tables):
+            connection.execute('CREATE TABLE t%d (id INTEGER PRIMARY KEY, name VARCHAR(80), '
+                               'parent_id INTEGER REFERENCES t%d (id))' % (i, i - 1))
+    engine.dispose()
+
+
+def run(url, workers, latency):
+    engine = create_engine(url, pool_size=max(5, workers)) if not url.startswith('sqlite') else create_engine(url)
+    if latency:
+        event.listen(engine, 'before_cursor_execute', lambda *args: time.sleep(latency / 1000.0))
+    with ReflectionSession(engine, bulk=False) as reflection:
+        started = time.time()
+        snapshot = SchemaSnapshot.capture(reflection, workers=workers)
+        elapsed = time.time() - started
+        return elapsed, len(snapshot), reflection.round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='remote database to reflect, defaults to a generated SQLite schema')
+    parser.add_argument('--tables', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--latency', type=float, default=2.0, help='milliseconds added to every statement')
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+        url = 'sqlite:///' + path
+        create_schema(url, args.tables)
+
+    baseline = None
+    print('%8s %8s %12s %10s %8s' % ('workers', 'tables', 'round-trips', 'seconds', 'speedup'))
+    for workers in args.workers:
+        elapsed, tables, round_trips = run(url, workers, args.latency)
+        baseline = baseline or elapsed
+        print('%8d %8d %12d %10.3f %7.2fx' % (workers, tables, round_trips, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
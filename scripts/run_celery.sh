@@ -1,3 +1,3 @@
 #!/usr/bin/env bash
 
-watchmedo auto-restart -- celery -A celery_worker:celery worker --loglevel=INFO
\ No newline at end of file
+watchmedo auto-restart -- celery -A celery_worker:celery worker -B --loglevel=INFO
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# config reads the environment on import, the metadata store of the tests is a throwaway sqlite file
+TEST_DIR = tempfile.mkdtemp(prefix='crawler-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'metadata.db')
+os.environ.setdefault('LOGGING_LOCATION', os.path.join(TEST_DIR, 'app.log'))
+os.environ.pop('METADATA_CACHE_REDIS_URL', None)
+
+from app import create_app, db, metadata_cache  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['PROGRESS_REDIS_URL'] = None
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        metadata_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_statements(app):
+    """count_statements() counts the statements sent to the metadata store inside its block"""
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counting
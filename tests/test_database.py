@@ -0,0 +1,42 @@
+import pytest
+
+from app import db
+from app.models.column import Column
+from app.models.database import Database
+from app.models.table import Table
+
+
+@pytest.fixture
+def database(app):
+    """accounts in the default schema and in archive, with different keys"""
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    db.session.add(database)
+    db.session.flush()
+    for schema_name, columns in ((None, [('id', True), ('name', False)]),
+                                 ('archive', [('account_id', True), ('closed_at', False)])):
+        table = Table('accounts')
+        table.database_id = database.id
+        table.schema_name = schema_name
+        db.session.add(table)
+        db.session.flush()
+        for name, is_pk in columns:
+            column = Column(name, 'INTEGER', None, not is_pk, is_pk=is_pk)
+            column.table_id = table.id
+            db.session.add(column)
+    db.session.commit()
+    return database
+
+
+def test_tables_into_dictionary_keeps_schemas_apart(database):
+    assert database.get_tables_into_dictionary() == {(None, 'accounts'): ['id', 'name'],
+                                                     ('archive', 'accounts'): ['account_id', 'closed_at']}
+
+
+def test_table_lookups_take_the_schema(database):
+    assert database.get_table_by_name('accounts').schema_name is None
+    assert database.get_table_by_name('accounts', 'archive').schema_name == 'archive'
+    assert database.get_primary_key_names_of_table('accounts') == ['id']
+    assert database.get_primary_key_names_of_table('accounts', 'archive') == ['account_id']
+    assert database.get_foreign_key_names_of_table('accounts', 'archive') == []
+    assert database.get_primary_keys_of_table('accounts', 'sales') is None
+    assert set(database.get_primary_keys_by_table()) == {(None, 'accounts'), ('archive', 'accounts')}
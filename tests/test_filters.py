@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+from app.crawler.filters import TableFilter, compile_pattern
+
+
+def test_glob_matches_whole_names():
+    pattern = compile_pattern('order*')
+
+    assert pattern.search('orders')
+    assert not pattern.search('sales_orders')
+    assert not pattern.search('Orders')
+
+
+def test_regex_searches_anywhere_unless_anchored():
+    assert compile_pattern('re:_bak').search('orders_bak_2019')
+    assert not compile_pattern('re:_bak$').search('orders_bak_2019')
+
+
+def test_invalid_regex_raises():
+    with pytest.raises(re.error):
+        compile_pattern('re:(')
+
+
+def test_exclude_wins_over_include():
+    table_filter = TableFilter(include=['order*'], exclude=['re:_bak$'])
+
+    kept, skipped = table_filter.apply(['orders', 'orders_bak', 'accounts'])
+
+    assert kept == ['orders']
+    assert skipped == {'excluded': 1, 'not_included': 1}
+
+
+def test_patterns_match_schema_qualified_names():
+    table_filter = TableFilter(exclude=['archive.*'])
+
+    assert table_filter.apply(['orders'], schema='archive')[0] == []
+    assert table_filter.apply(['orders'], schema='sales')[0] == ['orders']
+
+
+def test_partitions_collapse_before_patterns():
+    table_filter = TableFilter(exclude=['re:2019'])
+
+    kept, skipped = table_filter.apply(['events', 'events_2019', 'events_2020'],
+                                       partitions={'events_2019': 'events', 'events_2020': 'events'})
+
+    assert kept == ['events']
+    assert skipped == {'partitions': 2}
+
+
+def test_partitions_are_kept_when_not_collapsed():
+    table_filter = TableFilter(collapse_partitions=False)
+
+    kept, skipped = table_filter.apply(['events', 'events_2019'], partitions={'events_2019': 'events'})
+
+    assert kept == ['events', 'events_2019']
+    assert not skipped
+
+
+def test_cap_keeps_the_first_names_by_name():
+    table_filter = TableFilter(max_tables=2)
+
+    kept, skipped = table_filter.apply(['orders', 'accounts', 'zones', 'invoices'])
+
+    assert kept == ['accounts', 'invoices']
+    assert skipped == {'over_cap': 2}
+    # the same tables survive whatever order the catalog lists them in
+    assert sorted(table_filter.apply(['zones', 'invoices', 'orders', 'accounts'])[0]) == kept
+
+
+def test_cap_counts_only_tables_left_by_the_patterns():
+    table_filter = TableFilter(exclude=['a*'], max_tables=1)
+
+    kept, skipped = table_filter.apply(['accounts', 'orders', 'invoices'])
+
+    assert kept == ['invoices']
+    assert skipped == {'excluded': 1, 'over_cap': 1}
+
+
+def test_key_changes_with_the_settings():
+    assert TableFilter(include=['a*']).key == TableFilter(include=['a*']).key
+    assert TableFilter(include=['a*']).key != TableFilter(exclude=['a*']).key
+    assert TableFilter(max_tables=1).key != TableFilter(max_tables=2).key
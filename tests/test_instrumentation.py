@@ -0,0 +1,50 @@
+from app.crawler.instrumentation import merge_reports
+
+
+def chunk_report(stages, statements, round_trips, tables, columns, rows_written):
+    return {
+        'seconds': sum(stages.values()),
+        'stages': stages,
+        'statements': sum(statements.values()),
+        'statements_by_stage': statements,
+        'round_trips': round_trips,
+        'remote_calls': {'catalog': 1, 'columns': tables},
+        'remote_seconds': {'catalog': 0.25},
+        'rows': {'tables': tables, 'columns': columns},
+        'rows_written': rows_written,
+        'state_updates': {'sent': 2, 'seconds': 0.001}
+    }
+
+
+def test_merge_reports_adds_up_the_chunks():
+    chunks = [chunk_report({'reflect': 1.0, 'tables': 0.5}, {'tables': 3}, 4, 10, 40, 50),
+              chunk_report({'reflect': 2.0, 'columns': 0.25}, {'tables': 2, 'columns': 1}, 6, 5, 20, 25)]
+    callback = {'seconds': 3.5, 'stages': {'setup': 0.1, 'fks': 0.2}, 'statements': 2,
+                'statements_by_stage': {'fks': 2}, 'skipped': {'excluded': 7}}
+
+    merged = merge_reports(chunks, callback)
+
+    assert merged['seconds'] == 3.5
+    assert merged['stages'] == {'reflect': 3.0, 'tables': 0.5, 'columns': 0.25, 'setup': 0.1, 'fks': 0.2}
+    assert merged['statements_by_stage'] == {'tables': 5, 'columns': 1, 'fks': 2}
+    assert merged['statements'] == 8
+    assert merged['round_trips'] == 10
+    assert merged['remote_calls'] == {'catalog': 2, 'columns': 15}
+    assert merged['remote_seconds'] == {'catalog': 0.5}
+    assert merged['rows'] == {'tables': 15, 'columns': 60}
+    assert merged['rows_written'] == 75
+    assert merged['state_updates'] == {'sent': 4, 'seconds': 0.002}
+    assert merged['skipped'] == {'excluded': 7}
+    assert merged['chunks'] == 2
+
+
+def test_merge_reports_counts_the_callback_statements_once():
+    callback = {'seconds': 1.0, 'stages': {'fks': 1.0}, 'statements': 3, 'statements_by_stage': {'fks': 3}}
+
+    merged = merge_reports([], callback)
+
+    assert merged['statements'] == 3
+    assert merged['statements_by_stage'] == {'fks': 3}
+    assert merged['stages'] == {'fks': 1.0}
+    assert merged['round_trips'] == 0
+    assert merged['chunks'] == 0
@@ -0,0 +1,46 @@
+import pytest
+
+from app import db
+from app.models.crawl_run import CrawlRun
+from app.models.database import Database
+from app.models.table import Table
+
+# arguments url_for or the routes take as keywords, they must not end up in the next link
+RESERVED = 'db_id=99&endpoint=x&_external=0&_anchor=top'
+
+
+@pytest.fixture
+def database(app):
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    db.session.add(database)
+    db.session.flush()
+    for name in ('accounts', 'orders'):
+        table = Table(name)
+        table.database_id = database.id
+        db.session.add(table)
+    for kind in ('crawl', 'recrawl'):
+        db.session.add(CrawlRun.from_report(database.id, kind, 'completed', {'seconds': 1.0, 'statements': 1}))
+    db.session.commit()
+    return database
+
+
+def next_link(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    link = response.get_json()['_links']['next']
+    assert not any(name in link for name in ('db_id', 'endpoint', '_external', '_anchor'))
+    return link
+
+
+def test_tables_next_link_drops_reserved_arguments(client, database):
+    link = next_link(client, '/api/v1/connection/%d/tables?limit=1&%s' % (database.id, RESERVED))
+
+    assert link.startswith('http://localhost/api/v1/connection/%d/tables?' % database.id)
+    assert [table['table_name'] for table in client.get(link).get_json()['data']] == ['orders']
+
+
+def test_crawls_next_link_drops_reserved_arguments(client, database):
+    link = next_link(client, '/api/v1/connection/%d/crawls?limit=1&%s' % (database.id, RESERVED))
+
+    assert link.startswith('http://localhost/api/v1/connection/%d/crawls?' % database.id)
+    assert [run['kind'] for run in client.get(link).get_json()['data']] == ['crawl']
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from app.crawler.progress import ProgressReporter
+
+
+class FakeTask(object):
+    """records the progress written to the result backend"""
+
+    def __init__(self):
+        self.request = SimpleNamespace(id='crawl')
+        self.states = []
+
+    def update_state(self, state, meta):
+        self.states.append(meta)
+
+
+def test_a_stage_change_is_flushed_once():
+    task = FakeTask()
+    progress = ProgressReporter(task, min_interval=3600)
+
+    progress.stage('reflect')
+    progress.add_parts(['public', 'archive'], status='pending')
+    progress.stage('reflect')
+    assert [meta['stage'] for meta in task.states] == ['reflect']
+
+    progress.part('public', status='reflected')
+    progress.update(5, 1000)
+    progress.stage('tables')
+
+    assert [meta['stage'] for meta in task.states] == ['reflect', 'reflect', 'tables']
+    assert task.states[1]['parts'] == {'public': {'status': 'reflected'}, 'archive': {'status': 'pending'}}
+    assert task.states[-1]['current'] == 5
+    assert progress.stats['sent'] == 3
@@ -0,0 +1,65 @@
+from app import db
+from app.crawler.search import TermIndex, index_names, insert_terms, prune_names
+from app.models.database import Database
+from app.models.search_term import SearchTerm
+from app.models.table import Table
+
+
+def terms():
+    return sorted(term for term, in db.session.query(SearchTerm.term))
+
+
+def test_index_names_adds_only_new_terms(app):
+    assert index_names(db.session, ['orders', 'accounts', 'orders', None]) == 2
+    assert index_names(db.session, ['orders', 'invoices']) == 1
+
+    assert terms() == ['accounts', 'invoices', 'orders']
+
+
+def test_insert_terms_skips_terms_added_meanwhile(app):
+    # another crawl inserted orders between our select and our insert
+    insert_terms(db.session, ['orders'])
+
+    assert insert_terms(db.session, ['orders', 'accounts']) == 1
+    assert terms() == ['accounts', 'orders']
+
+
+def test_prune_names_keeps_terms_still_in_use(app):
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    db.session.add(database)
+    db.session.flush()
+    table = Table('orders')
+    table.database_id = database.id
+    db.session.add(table)
+    db.session.flush()
+    index_names(db.session, ['orders', 'accounts'])
+
+    assert prune_names(db.session, ['orders', 'accounts']) == 1
+    assert terms() == ['orders']
+
+
+def test_term_index_picks_up_terms_committed_behind_later_ids(app):
+    index = TermIndex(overlap=10)
+    db.session.execute(SearchTerm.__table__.insert().values(id=5, term='orders'))
+    index.refresh(db.session)
+
+    # a crawl that took id 3 before orders got 5 commits only now
+    db.session.execute(SearchTerm.__table__.insert().values(id=3, term='accounts'))
+    index.refresh(db.session)
+
+    assert sorted(index.terms) == ['accounts', 'orders']
+    assert index.similar('accounts', 0.5, 5)[0][0] == 'accounts'
+
+
+def test_term_index_rebuild_reads_past_the_overlap(app):
+    index = TermIndex(overlap=1, rebuild_seconds=3600)
+    db.session.execute(SearchTerm.__table__.insert().values(id=50, term='orders'))
+    index.refresh(db.session)
+    db.session.execute(SearchTerm.__table__.insert().values(id=3, term='accounts'))
+
+    index.refresh(db.session)
+    assert index.terms == ['orders']
+
+    index.rebuilt_at -= 3600
+    index.refresh(db.session)
+    assert sorted(index.terms) == ['accounts', 'orders']
@@ -0,0 +1,80 @@
+from flask import jsonify
+
+from app import db, metadata_cache
+from app.models.column import Column
+from app.models.database import Database
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+
+def add_database(table_count):
+    """a crawled database of table_count tables, every table but the first referring to the one before"""
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    database.status = 'processed'
+    db.session.add(database)
+    db.session.flush()
+    previous = None
+    for number in range(table_count):
+        table = Table('table_%d' % number)
+        table.database_id = database.id
+        table.schema_name = 'sales' if number % 2 else None
+        db.session.add(table)
+        db.session.flush()
+        key = Column('id', 'INTEGER', None, False, is_autoincrement=True, is_pk=True)
+        reference = Column('parent_id', 'INTEGER', None, True, is_fk=previous is not None)
+        for column in (key, reference):
+            column.table_id = table.id
+            db.session.add(column)
+        db.session.flush()
+        if previous is not None:
+            db.session.add(ForeignKey(reference.id, table.id, previous[1].id, previous[0].id))
+        previous = table, key
+    db.session.commit()
+    return database
+
+
+def normalized(tables):
+    """Table.to_json leaves the order of columns and relations to the backend, the serializer orders by id"""
+    return [dict(table,
+                 columns=sorted(table['columns'], key=lambda column: column['id']),
+                 relations=sorted(table['relations'], key=lambda relation: relation['referred_column_id']),
+                 reverse_relations=sorted(table['reverse_relations'],
+                                          key=lambda relation: relation['reverse_column_id']))
+            for table in tables]
+
+
+def test_get_connection_matches_table_to_json(client):
+    database = add_database(6)
+    expected = [table.to_json for table in Table.query.filter_by(database_id=database.id).order_by(Table.id)]
+
+    response = client.get('/api/v1/connection/%d' % database.id)
+
+    assert response.status_code == 200
+    assert normalized(response.get_json()['tables']) == normalized(expected)
+
+
+def test_get_connection_statements_do_not_grow_with_tables(client, count_statements):
+    small, large = add_database(3), add_database(30)
+    # the first request of the app creates the missing tables
+    client.get('/health')
+
+    counts = []
+    for database in (small, large):
+        db.session.expire_all()
+        with count_statements() as statements:
+            assert client.get('/api/v1/connection/%d' % database.id).status_code == 200
+        counts.append(len(statements))
+
+    # the database row, then tables, columns and foreign keys with one select each
+    assert counts == [4, 4]
+
+
+def test_get_connection_serves_to_json_and_caches_no_credentials(client):
+    database = add_database(2)
+    expected = jsonify(database.to_json).get_data()
+
+    first = client.get('/api/v1/connection/%d' % database.id)
+    cached = client.get('/api/v1/connection/%d' % database.id)
+
+    assert first.get_data() == cached.get_data() == expected
+    assert all(b'secret' not in body for body in metadata_cache.entries.values())
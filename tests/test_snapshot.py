@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from app.crawler.reflection import ReflectionSession
+from app.crawler.snapshot import SchemaSnapshot
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """a sqlite database with an attached 'other' schema, both holding an accounts table of their own"""
+    main, other = str(tmp_path / 'main.db'), str(tmp_path / 'other.db')
+    connection = sqlite3.connect(main)
+    connection.execute('create table accounts (id integer primary key, name text)')
+    connection.execute('create table orders (id integer primary key, account_id integer references accounts(id))')
+    connection.commit()
+    connection.close()
+    connection = sqlite3.connect(other)
+    connection.execute('create table accounts (id integer primary key, email text, created_at timestamp)')
+    connection.commit()
+    connection.close()
+
+    engine = create_engine('sqlite:///' + main)
+
+    @event.listens_for(engine, 'connect')
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute("attach database '%s' as other" % other.replace("'", "''"))
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize('schema_workers', [1, 2])
+def test_capture_schemas_keeps_same_named_tables_apart(remote, schema_workers):
+    with ReflectionSession(remote) as reflection:
+        snapshot = SchemaSnapshot.capture_schemas(reflection, [None, 'other'], schema_workers=schema_workers)
+
+    assert list(snapshot.tables) == [(None, 'accounts'), (None, 'orders'), ('other', 'accounts')]
+    assert [column['name'] for column in snapshot[(None, 'accounts')].columns] == ['id', 'name']
+    assert [column['name'] for column in snapshot[('other', 'accounts')].columns] == ['id', 'email', 'created_at']
+    assert snapshot[(None, 'accounts')].fingerprint != snapshot[('other', 'accounts')].fingerprint
+
+
+def test_capture_schemas_reports_every_schema(remote):
+    captured = []
+    with ReflectionSession(remote) as reflection:
+        SchemaSnapshot.capture_schemas(reflection, [None, 'other'], schema_workers=2,
+                                       on_captured=lambda schema, snapshot: captured.append((schema, len(snapshot))))
+
+    assert dict(captured) == {None: 2, 'other': 1}
+
+
+def test_round_trips_of_other_users_of_the_engine_are_not_counted(remote):
+    with ReflectionSession(remote) as reflection:
+        SchemaSnapshot.capture_schemas(reflection, [None, 'other'], workers=2, schema_workers=2)
+        counted = reflection.round_trips
+        # a ping or another crawl sharing the registry engine
+        with remote.connect() as connection:
+            connection.execute('select 1')
+
+        assert counted > 0
+        assert reflection.round_trips == counted
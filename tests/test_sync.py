@@ -0,0 +1,70 @@
+from sqlalchemy.types import INTEGER, TEXT
+
+from app import db
+from app.crawler.snapshot import SchemaSnapshot, TableSnapshot
+from app.crawler.sync import MetadataSync
+from app.models.column import Column
+from app.models.database import Database
+from app.models.foreignkey import ForeignKey
+from app.models.table import Table
+
+
+def column(name, type_=TEXT):
+    return {'name': name, 'type': type_(), 'default': None, 'nullable': name != 'id', 'autoincrement': False}
+
+
+def accounts(schema, *names):
+    return TableSnapshot('accounts', [column('id', INTEGER)] + [column(name) for name in names], ['id'], [],
+                         schema=schema)
+
+
+def orders(schema):
+    foreign_key = {'constrained_columns': ['account_id'], 'referred_schema': schema, 'referred_table': 'accounts',
+                   'referred_columns': ['id']}
+    return TableSnapshot('orders', [column('id', INTEGER), column('account_id', INTEGER)], ['id'], [foreign_key],
+                         schema=schema)
+
+
+def stored_tables(database):
+    return dict(((table.schema_name, table.table_name), table.id)
+                for table in Table.query.filter_by(database_id=database.id))
+
+
+def sync(database, tables):
+    metadata_sync = MetadataSync(db.session, database.id)
+    metadata_sync.apply(SchemaSnapshot(None, tables))
+    db.session.commit()
+    return metadata_sync
+
+
+def test_sync_keys_tables_by_schema_and_name(app):
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    db.session.add(database)
+    db.session.commit()
+    first = sync(database, [accounts(None, 'name'), orders(None), accounts('archive', 'email')])
+    before = stored_tables(database)
+
+    second = sync(database, [accounts(None, 'name'), orders(None), accounts('archive', 'email', 'closed_at')])
+
+    assert (first.inserted, second.inserted, second.updated, second.unchanged, second.deleted) == (3, 0, 1, 2, 0)
+    assert stored_tables(database) == before
+    archived = Column.query.filter_by(table_id=before[('archive', 'accounts')]).order_by(Column.id)
+    assert [column.column_name for column in archived] == ['id', 'email', 'closed_at']
+    current = Column.query.filter_by(table_id=before[(None, 'accounts')]).order_by(Column.id)
+    assert [column.column_name for column in current] == ['id', 'name']
+
+
+def test_sync_removes_a_table_from_one_schema_only(app):
+    database = Database('postgresql', 'user', 'secret', 'localhost', 'shop')
+    db.session.add(database)
+    db.session.commit()
+    sync(database, [accounts(None, 'name'), orders(None), accounts('archive', 'email')])
+    before = stored_tables(database)
+
+    removed = sync(database, [accounts(None, 'name'), orders(None)])
+
+    assert (removed.deleted, removed.unchanged) == (1, 2)
+    assert stored_tables(database) == {(None, 'accounts'): before[(None, 'accounts')],
+                                       (None, 'orders'): before[(None, 'orders')]}
+    foreign_key = ForeignKey.query.one()
+    assert foreign_key.referred_table_id == before[(None, 'accounts')]
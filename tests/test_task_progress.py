@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+from celery.exceptions import Retry
+
+from app.api.dbconnection import TaskProgress
+
+
+class FakeResult(object):
+    def __init__(self, state, info):
+        self.state = state
+        self.info = info
+
+
+def backend_states(monkeypatch, *results):
+    """save_metadata.AsyncResult answers with the given results in turn, repeating the last one"""
+    results = list(results)
+
+    def async_result(task_id):
+        return results.pop(0) if len(results) > 1 else results[0]
+
+    monkeypatch.setattr(TaskProgress.save_metadata, 'AsyncResult', async_result)
+
+
+def events(response):
+    return [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).split('\n\n')
+            if line.startswith('data: ')]
+
+
+def test_task_progress_of_a_retrying_task(app, monkeypatch):
+    backend_states(monkeypatch, FakeResult('RETRY', Retry('unable to open database file')))
+
+    response, info = TaskProgress.task_progress('crawl')
+
+    assert response['state'] == 'RETRY'
+    assert 'unable to open database file' in response['status']
+    assert info == {}
+
+
+def test_stream_follows_a_task_through_a_retry(client, monkeypatch):
+    backend_states(monkeypatch,
+                   FakeResult('RETRY', Retry('unable to open database file')),
+                   FakeResult('SUCCESS', {'current': 3, 'total': 3, 'status': 'completed', 'result': 1}))
+
+    response = client.get('/api/v1/progress/crawl/stream')
+
+    assert response.status_code == 200
+    assert [event['state'] for event in events(response)] == ['RETRY', 'SUCCESS']
+    assert events(response)[-1]['result'] == 1
+
+
+def test_stream_ends_on_a_revoked_task(client, monkeypatch):
+    backend_states(monkeypatch, FakeResult('REVOKED', Exception('revoked')))
+
+    response = client.get('/api/v1/progress/crawl/stream')
+
+    assert [event['state'] for event in events(response)] == ['REVOKED']
+
+
+class FakeGroup(object):
+    def __init__(self, *task_ids):
+        self.results = [SimpleNamespace(id=task_id) for task_id in task_ids]
+
+
+def test_batch_progress_with_a_retrying_and_a_revoked_crawl(app, monkeypatch):
+    states = {'a': FakeResult('RETRY', Retry('timeout')), 'b': FakeResult('REVOKED', Exception('revoked')),
+              'c': FakeResult('SUCCESS', {'current': 2, 'total': 2, 'status': 'completed', 'result': 3})}
+    monkeypatch.setattr(TaskProgress.save_metadata, 'AsyncResult', lambda task_id: states[task_id])
+    monkeypatch.setattr(TaskProgress.GroupResult, 'restore', lambda group_id, app=None: FakeGroup('a', 'b', 'c'))
+
+    progress = TaskProgress.batch_progress('batch')
+
+    assert progress['states'] == {'RETRY': 1, 'REVOKED': 1, 'SUCCESS': 1}
+    assert (progress['status'], progress['current'], progress['total']) == ('pending', 2.0, 3)
+
+    states['a'] = FakeResult('FAILURE', Exception('timeout'))
+    assert TaskProgress.batch_progress('batch')['status'] == 'completed'